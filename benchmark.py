@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import multiprocessing
+import platform
+import sys
+
+try:
+    import resource
+except ImportError:
+    resource = None
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from missionarios_canibais import *
+from cache_solucoes import assinatura_motor
+
+# Versão do formato dos arquivos de resultados. Deve ser incrementada sempre que a estrutura
+# dos registros mudar.
+VERSAO_FORMATO = 2
+
+ALGORITMOS_PADRAO = ('largura', 'profundidade', 'gulosa', 'astar')
+PESSOAS_PADRAO = (3, 5, 10, 25, 50, 100, 250, 500, 1000, 2000)
+BARCOS_PADRAO = (2, 3, 4, 5, 6)
+
+# Duração mínima de cada amostra de tempo, em segundos: buscas mais rápidas são repetidas
+# dentro da amostra (ver calibrar), para que o tempo medido não seja dominado pela resolução
+# do relógio e pelo ruído do sistema
+DURACAO_MINIMA_AMOSTRA = 0.1
+# Variações de tempo menores que esta, em segundos, são consideradas ruído e nunca contam
+# como regressão
+RUIDO_TEMPO = 0.001
+
+# Métricas comparadas entre duas execuções, como (nome, tolerância relativa, variação
+# absoluta mínima). None usa a tolerância informada em comparar; as contagens de estados são
+# determinísticas e qualquer aumento é uma regressão. O tempo comparado é o mínimo das
+# amostras, o menos afetado por interferências de outros processos.
+METRICAS_COMPARADAS = (
+    ('tempo_minimo', None, RUIDO_TEMPO),
+    ('estados_visitados', 0.0, 0),
+    ('estados_gerados', 0.0, 0),
+    ('tamanho_maximo_fronteira', 0.0, 0),
+    ('pico_memoria_kb', None, 0),
+)
+
+
+def pico_rss_kb():
+    """
+        Pico de memória residente do processo atual, em kB, ou None se não for possível
+        medi-lo nesta plataforma.
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # No macOS ru_maxrss é dado em bytes; nos demais sistemas POSIX, em kB
+    if sys.platform == 'darwin':
+        pico //= 1024
+    return pico
+
+
+def executar(num_pessoas, tam_barco, algoritmo, limite_tempo, lacos=1):
+    """
+        Executa lacos buscas sem rastro, cada uma em uma instância nova, e retorna (tempo
+        total, última instância). Apenas as chamadas dos métodos de busca são cronometradas.
+    """
+    tempo = 0.0
+    for _ in range(lacos):
+        instancia = Missionarios_Canibais(num_pessoas, tam_barco, RASTRO_NENHUM, limite_tempo=limite_tempo)
+        metodo = getattr(instancia, ALGORITMOS[algoritmo])
+        inicio = relogio()
+        metodo()
+        tempo += relogio() - inicio
+    return tempo, instancia
+
+
+def calibrar(num_pessoas, tam_barco, algoritmo, limite_tempo, duracao_minima=DURACAO_MINIMA_AMOSTRA):
+    """
+        Escolhe o número de buscas de cada amostra como timeit.Timer.autorange: o primeiro
+        valor da sequência 1, 2, 5, 10, 20, 50, ... com o qual a amostra dura pelo menos
+        duracao_minima segundos.
+    """
+    multiplicador = 1
+    while True:
+        for lacos in (multiplicador, 2 * multiplicador, 5 * multiplicador):
+            tempo, _ = executar(num_pessoas, tam_barco, algoritmo, limite_tempo, lacos)
+            if tempo >= duracao_minima:
+                return lacos
+        multiplicador *= 10
+
+
+def medir_caso(num_pessoas, tam_barco, algoritmo, repeticoes=5, aquecimento=1, limite_tempo=None):
+    """
+        Mede uma configuração: aquecimento execuções descartadas e depois repeticoes
+        amostras cronometradas, cada uma com o número de buscas escolhido por calibrar; os
+        tempos registrados são por busca. O pico de memória alocada é medido em uma execução à parte
+        com tracemalloc, que deixa as buscas mais lentas. É executada em um processo novo para
+        cada caso (ver medir), de forma que o pico de RSS também é o do próprio caso.
+    """
+    for _ in range(aquecimento):
+        executar(num_pessoas, tam_barco, algoritmo, limite_tempo)
+    lacos = calibrar(num_pessoas, tam_barco, algoritmo, limite_tempo)
+    tempos = []
+    for _ in range(repeticoes):
+        tempo, instancia = executar(num_pessoas, tam_barco, algoritmo, limite_tempo, lacos)
+        tempos.append(tempo / lacos)
+    tempos.sort()
+    pico_memoria_kb = None
+    if tracemalloc is not None:
+        tracemalloc.start()
+        executar(num_pessoas, tam_barco, algoritmo, limite_tempo)
+        pico_memoria_kb = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    return {
+        'num_pessoas': num_pessoas,
+        'tam_barco': tam_barco,
+        'algoritmo': algoritmo,
+        'situacao': instancia.estatisticas['situacao'],
+        'profundidade_solucao': instancia.estatisticas['profundidade_solucao'],
+        'estados_visitados': instancia.estatisticas['estados_visitados'],
+        'estados_gerados': instancia.estatisticas['estados_gerados'],
+        'tamanho_maximo_fronteira': instancia.estatisticas['tamanho_maximo_fronteira'],
+        'repeticoes': repeticoes,
+        'lacos': lacos,
+        'tempo_minimo': tempos[0],
+        'tempo_mediano': tempos[len(tempos) // 2],
+        'tempo_medio': sum(tempos) / len(tempos),
+        'pico_memoria_kb': pico_memoria_kb,
+        'pico_rss_kb': pico_rss_kb(),
+    }
+
+
+def medir(pessoas=PESSOAS_PADRAO, barcos=BARCOS_PADRAO, algoritmos=ALGORITMOS_PADRAO, repeticoes=5, aquecimento=1,
+          limite_tempo=None):
+    """
+        Mede todas as combinações de pessoas, barcos e algoritmos e retorna o documento de
+        resultados, que pode ser guardado com json.dump e usado como base em comparar. Os
+        casos são executados um de cada vez, cada um em um processo novo, para que o pico de
+        RSS e o estado do interpretador de um caso não afetem os demais.
+    """
+    for algoritmo in algoritmos:
+        if algoritmo not in ALGORITMOS:
+            raise ValueError('Algoritmo desconhecido: {}'.format(algoritmo))
+    resultados = []
+    pool = multiprocessing.Pool(1, maxtasksperchild=1)
+    try:
+        for num_pessoas in pessoas:
+            for tam_barco in barcos:
+                for algoritmo in algoritmos:
+                    resultados.append(pool.apply(medir_caso, (num_pessoas, tam_barco, algoritmo, repeticoes, aquecimento,
+                                                              limite_tempo)))
+    finally:
+        pool.terminate()
+    return {
+        'versao': VERSAO_FORMATO,
+        'assinatura': assinatura_motor(),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'resultados': resultados,
+    }
+
+
+def comparar(base, atual, tolerancia=0.10):
+    """
+        Compara dois documentos de resultados e retorna a lista de diferenças, como tuplas
+        (num_pessoas, tam_barco, algoritmo, metrica, valor_base, valor_atual, regressao).
+        Tempos e memória só são listados quando variam mais do que tolerancia (relativa), e
+        o tempo mínimo também precisa variar mais do que RUIDO_TEMPO; contagens de estados
+        são listadas quando variam qualquer valor. regressao indica se a métrica cresceu.
+        Mudanças na situação ou na profundidade da solução são sempre regressões. Casos
+        presentes em apenas um dos documentos são ignorados.
+    """
+    chave = lambda registro: (registro['num_pessoas'], registro['tam_barco'], registro['algoritmo'])
+    anteriores = dict((chave(registro), registro) for registro in base['resultados'])
+    diferencas = []
+    for registro in atual['resultados']:
+        anterior = anteriores.get(chave(registro))
+        if anterior is None:
+            continue
+        for metrica in ('situacao', 'profundidade_solucao'):
+            if registro[metrica] != anterior[metrica]:
+                diferencas.append(chave(registro) + (metrica, anterior[metrica], registro[metrica], True))
+        for metrica, limite, minimo in METRICAS_COMPARADAS:
+            valor_base, valor_atual = anterior.get(metrica), registro.get(metrica)
+            if valor_base is None or valor_atual is None or valor_base == valor_atual:
+                continue
+            limite = tolerancia if limite is None else limite
+            variacao = abs(valor_atual - valor_base)
+            if variacao > valor_base * limite and variacao > minimo:
+                diferencas.append(chave(registro) + (metrica, valor_base, valor_atual, valor_atual > valor_base))
+    return diferencas
+
+
+def formatar_diferencas(diferencas):
+    linhas = []
+    for num_pessoas, tam_barco, algoritmo, metrica, valor_base, valor_atual, regressao in diferencas:
+        variacao = ''
+        if isinstance(valor_base, (int, float)) and isinstance(valor_atual, (int, float)) and valor_base:
+            variacao = ' ({:+.1%})'.format(float(valor_atual - valor_base) / valor_base)
+        linhas.append('{} N={} barco={} {} {}: {} -> {}{}'.format(
+            'REGRESSAO' if regressao else 'melhora', num_pessoas, tam_barco, algoritmo, metrica, valor_base,
+            valor_atual, variacao))
+    return '\n'.join(linhas)
+
+
+def main(argumentos=None):
+    """
+        Executa o benchmark pela linha de comando. Exemplos:
+            python benchmark.py --saida base.json
+            python benchmark.py --comparar base.json --saida atual.json
+        Retorna 1 se a comparação encontrar alguma regressão e 0 caso contrário.
+    """
+    parser = argparse.ArgumentParser(description='Compara o desempenho dos algoritmos de busca.')
+    parser.add_argument('--pessoas', type=int, nargs='+', default=PESSOAS_PADRAO)
+    parser.add_argument('--barcos', type=int, nargs='+', default=BARCOS_PADRAO)
+    parser.add_argument('--algoritmos', nargs='+', choices=sorted(ALGORITMOS), default=ALGORITMOS_PADRAO)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--aquecimento', type=int, default=1)
+    parser.add_argument('--limite-tempo', type=float, default=None, help='tempo limite de cada busca, em segundos')
+    parser.add_argument('--saida', help='arquivo JSON onde os resultados sao guardados')
+    parser.add_argument('--comparar', help='arquivo JSON com os resultados de base')
+    parser.add_argument('--tolerancia', type=float, default=0.10, help='aumento relativo tolerado em tempo e memoria')
+    opcoes = parser.parse_args(argumentos)
+    atual = medir(opcoes.pessoas, opcoes.barcos, opcoes.algoritmos, opcoes.repeticoes, opcoes.aquecimento,
+                  opcoes.limite_tempo)
+    if opcoes.saida:
+        with open(opcoes.saida, 'w') as arquivo:
+            json.dump(atual, arquivo, indent=1, sort_keys=True)
+    for registro in atual['resultados']:
+        print('N={num_pessoas} barco={tam_barco} {algoritmo}: {situacao}, {estados_visitados} estados, fronteira '
+              '{tamanho_maximo_fronteira}, {tempo_minimo:.6f} s, {pico_memoria_kb} kB'.format(**registro))
+    if not opcoes.comparar:
+        return 0
+    with open(opcoes.comparar) as arquivo:
+        base = json.load(arquivo)
+    if base.get('versao') != VERSAO_FORMATO:
+        print('Aviso: a execucao de base usa outra versao do formato de resultados')
+    if base.get('assinatura') != atual['assinatura']:
+        print('Aviso: o codigo das buscas mudou desde a execucao de base')
+    diferencas = comparar(base, atual, opcoes.tolerancia)
+    if diferencas:
+        print(formatar_diferencas(diferencas))
+    return 1 if any(diferenca[-1] for diferenca in diferencas) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# O NumPy é opcional: apenas a busca em largura vetorizada depende dele
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def valido_vetorizado(missionarios_esq, canibais_esq, num_missionarios, num_canibais):
+    """
+        Versão vetorizada de Problema.valido com a regra de segurança clássica: retorna a
+        máscara dos estados válidos.
+    """
+    missionarios_dir = num_missionarios - missionarios_esq
+    canibais_dir = num_canibais - canibais_esq
+    return ((missionarios_esq >= 0) & (missionarios_dir >= 0) &
+            (canibais_esq >= 0) & (canibais_dir >= 0) &
+            ((missionarios_esq == 0) | (missionarios_esq >= canibais_esq)) &
+            ((missionarios_dir == 0) | (missionarios_dir >= canibais_dir)))
+
+
+def tabela_validade(problema):
+    """
+        Máscara (num_missionarios + 1, num_canibais + 1) dos estados válidos para uma regra de
+        segurança qualquer, calculada uma única vez com Problema.valido.
+    """
+    tabela = numpy.zeros((problema.num_missionarios + 1, problema.num_canibais + 1), dtype=bool)
+    for missionarios_esq in range(problema.num_missionarios + 1):
+        for canibais_esq in range(problema.num_canibais + 1):
+            tabela[missionarios_esq, canibais_esq] = problema.valido(missionarios_esq, canibais_esq)
+    return tabela
+
+
+def busca_largura_vetorizada(problema, registrar_camada=None):
+    """
+        Busca em largura, uma camada por vez, a partir da raiz do problema. Cada camada é um
+        array com os índices m * (C + 1) + c dos seus estados, onde m e c são os missionários
+        e canibais à esquerda do rio e C o total de canibais, e todas as cargas do barco são
+        aplicadas de uma vez com broadcasting, filtradas por máscaras de validade. Com uma
+        regra de segurança própria, a validade vem de uma tabela calculada antes da busca. Os estados já alcançados ficam em
+        um mapa de bits por lado do rio (0 para a esquerda e 1 para a direita) e o pai de
+        cada estado em um array do mesmo tamanho, sempre no lado oposto. Esses arrays são
+        densos: com M o total de missionários, a memória usada é O((M + 1)(C + 1)), cerca de
+        10 bytes por combinação de missionários e canibais (um byte de visitado e um índice de
+        32 bits por lado), mesmo que a busca alcance poucos estados.
+        registrar_camada, se informado, é chamado depois de cada camada com o número de
+        estados expandidos, de sucessores válidos gerados (sem a volta de cada estado ao seu
+        pai, como em Problema.expandir) e de estados novos e a profundidade
+        da nova camada (ver Missionarios_Canibais.registrar_camada), e interrompe a busca, sem
+        solução, quando retorna True.
+        Retorna o caminho, a lista de chaves da raiz até o estado final, ou None se não houver
+        solução.
+    """
+    if numpy is None:
+        raise ImportError('A busca em largura vetorizada requer o NumPy')
+    lados = ('esq', 'dir')
+    largura = problema.num_canibais + 1
+    tamanho = (problema.num_missionarios + 1) * largura
+    # Índices de 32 bits reduzem à metade o array de pais e os temporários de cada camada
+    # enquanto os índices couberem neles
+    tipo_indice = numpy.int32 if tamanho <= numpy.iinfo(numpy.int32).max else numpy.int64
+    missionarios_esq, canibais_esq, lado_rio = problema.chave_inicial()
+    inicial = (lados.index(lado_rio), missionarios_esq * largura + canibais_esq)
+    missionarios_esq, canibais_esq, lado_rio = problema.chave_final()
+    final = (lados.index(lado_rio), missionarios_esq * largura + canibais_esq)
+    visitados = numpy.zeros((2, tamanho), dtype=bool)
+    pais = numpy.full((2, tamanho), -1, dtype=tipo_indice)
+    # Cargas das idas (a partir da margem esquerda) e das voltas
+    cargas_lados = (numpy.array(problema.movimentos, dtype=tipo_indice).reshape(-1, 2),
+                    numpy.array(problema.movimentos_volta, dtype=tipo_indice).reshape(-1, 2))
+    tabela = tabela_validade(problema) if problema.regra_seguranca is not None else None
+    visitados[inicial] = True
+    lado = inicial[0]
+    camada = numpy.array([inicial[1]], dtype=tipo_indice)
+    profundidade = 0
+    while not visitados[final] and len(camada):
+        # Na margem esquerda as pessoas saem do lado esquerdo; na direita, voltam para ele
+        sinal = -1 if lado == 0 else 1
+        cargas = cargas_lados[lado]
+        missionarios = camada[:, None] // largura + sinal * cargas[None, :, 0]
+        canibais = camada[:, None] % largura + sinal * cargas[None, :, 1]
+        if tabela is None:
+            validos = valido_vetorizado(missionarios, canibais, problema.num_missionarios, problema.num_canibais)
+        else:
+            validos = ((missionarios >= 0) & (missionarios <= problema.num_missionarios) &
+                       (canibais >= 0) & (canibais <= problema.num_canibais))
+            validos[validos] = tabela[missionarios[validos], canibais[validos]]
+        filhos = (missionarios * largura + canibais)[validos]
+        origens = numpy.broadcast_to(camada[:, None], validos.shape)[validos]
+        novo_lado = 1 - lado
+        # Como em Problema.expandir, a volta imediata ao pai não conta como sucessor
+        nao_voltam = filhos != pais[lado, origens]
+        filhos = filhos[nao_voltam]
+        origens = origens[nao_voltam]
+        novos = ~visitados[novo_lado, filhos]
+        gerados = len(filhos)
+        filhos, indices = numpy.unique(filhos[novos], return_index=True)
+        visitados[novo_lado, filhos] = True
+        pais[novo_lado, filhos] = origens[novos][indices]
+        expandidos = len(camada)
+        camada = filhos
+        lado = novo_lado
+        profundidade += 1
+        if registrar_camada is not None and registrar_camada(expandidos, gerados, len(camada), profundidade):
+            break
+    if not visitados[final]:
+        return None
+    # Reconstrói o caminho seguindo os pais, que alternam de lado a cada travessia
+    caminho = []
+    lado, indice = final
+    while True:
+        caminho.append((int(indice // largura), int(indice % largura), lados[lado]))
+        if (lado, indice) == inicial:
+            break
+        indice = pais[lado, indice]
+        lado = 1 - lado
+    caminho.reverse()
+    return caminho
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import collections
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+
+from missionarios_canibais import *
+import busca_vetorizada
+import missionarios_canibais
+
+# Versão do formato dos arquivos do cache. Deve ser incrementada sempre que a estrutura dos
+# registros mudar.
+VERSAO_FORMATO = 1
+
+# os.replace substitui o destino de forma atômica também no Windows; no Python 2 os.rename
+# faz o mesmo em sistemas POSIX
+renomear = getattr(os, 'replace', os.rename)
+
+# Módulos que definem o espaço de estados, as heurísticas, as buscas e as estatísticas
+# guardadas. Qualquer mudança no código deles muda a assinatura do motor e invalida as
+# soluções guardadas; o módulo inteiro é considerado, e não uma lista de funções, para que
+# nenhuma parte que influencie os resultados fique de fora.
+MODULOS_MOTOR = (missionarios_canibais, busca_vetorizada)
+
+
+def assinatura_motor():
+    """
+        Calcula um hash do código-fonte completo dos módulos do motor de busca.
+    """
+    resumo = hashlib.sha1()
+    for modulo in MODULOS_MOTOR:
+        with open(inspect.getsourcefile(modulo), 'rb') as arquivo:
+            resumo.update(arquivo.read())
+    return resumo.hexdigest()
+
+
+class CacheSolucoes():
+    """
+        Cache em disco das soluções encontradas pelos métodos gerar_solucao_* de
+        Missionarios_Canibais, indexado por (num_pessoas, tam_barco, algoritmo). Cada solução
+        fica em um arquivo JSON próprio dentro de diretorio, contendo o caminho (como listas
+        [missionarios_esq, canibais_esq, lado_rio]) e as estatísticas da busca.
+        Os arquivos são escritos em um arquivo temporário e depois renomeados, o que é atômico,
+        então vários processos podem usar o mesmo diretório ao mesmo tempo. O número de
+        arquivos é limitado a tamanho_maximo: a data de modificação de um arquivo é atualizada
+        a cada leitura e os menos usados recentemente são apagados. As soluções mais recentes
+        também ficam em memória, para que consultas repetidas no mesmo processo não precisem
+        nem ler o disco.
+    """
+
+    def __init__(self, diretorio, tamanho_maximo=256):
+        self.diretorio = diretorio
+        self.tamanho_maximo = tamanho_maximo
+        self.assinatura = assinatura_motor()
+        self.memoria = collections.OrderedDict()
+        if not os.path.isdir(diretorio):
+            try:
+                os.makedirs(diretorio)
+            except OSError:
+                # Outro processo pode ter criado o diretório ao mesmo tempo
+                if not os.path.isdir(diretorio):
+                    raise
+
+    def nome_arquivo(self, num_pessoas, tam_barco, algoritmo):
+        """
+            O nome do arquivo inclui a versão do formato e a assinatura do motor, de forma que
+            soluções de versões anteriores nunca são lidas e acabam removidas pelo limite de
+            tamanho.
+        """
+        chave = '{}|{}|{}|{}|{}'.format(VERSAO_FORMATO, self.assinatura, num_pessoas, tam_barco, algoritmo)
+        return os.path.join(self.diretorio, hashlib.sha1(chave.encode('utf-8')).hexdigest() + '.json')
+
+    def obter(self, num_pessoas, tam_barco, algoritmo):
+        """
+            Retorna o registro guardado para a configuração, ou None se ele não existir.
+        """
+        chave = (num_pessoas, tam_barco, algoritmo)
+        registro = self.memoria.get(chave)
+        if registro is not None:
+            self.memoria.pop(chave)
+            self.memoria[chave] = registro
+            return registro
+        nome = self.nome_arquivo(num_pessoas, tam_barco, algoritmo)
+        try:
+            with open(nome) as arquivo:
+                registro = json.load(arquivo)
+            os.utime(nome, None)
+        except (IOError, OSError, ValueError):
+            return None
+        if (registro.get('versao') != VERSAO_FORMATO or registro.get('assinatura') != self.assinatura or
+                [registro.get('num_pessoas'), registro.get('tam_barco'), registro.get('algoritmo')] != list(chave)):
+            return None
+        self.guardar_memoria(chave, registro)
+        return registro
+
+    def guardar(self, num_pessoas, tam_barco, algoritmo, caminho, estatisticas):
+        """
+            Guarda a solução de uma configuração e retorna o registro criado.
+        """
+        registro = {
+            'versao': VERSAO_FORMATO,
+            'assinatura': self.assinatura,
+            'num_pessoas': num_pessoas,
+            'tam_barco': tam_barco,
+            'algoritmo': algoritmo,
+            'caminho': caminho,
+            'estatisticas': estatisticas,
+        }
+        descritor, temporario = tempfile.mkstemp(dir=self.diretorio, suffix='.tmp')
+        try:
+            with os.fdopen(descritor, 'w') as arquivo:
+                json.dump(registro, arquivo)
+            renomear(temporario, self.nome_arquivo(num_pessoas, tam_barco, algoritmo))
+        except BaseException:
+            try:
+                os.remove(temporario)
+            except OSError:
+                pass
+            raise
+        self.guardar_memoria((num_pessoas, tam_barco, algoritmo), registro)
+        self.remover_excedentes()
+        return registro
+
+    def guardar_memoria(self, chave, registro):
+        self.memoria[chave] = registro
+        while len(self.memoria) > self.tamanho_maximo:
+            self.memoria.popitem(last=False)
+
+    def remover_excedentes(self):
+        """
+            Apaga os arquivos menos usados recentemente até que o cache respeite o limite de
+            tamanho. Arquivos apagados por outro processo no meio do caminho são ignorados.
+        """
+        arquivos = []
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith('.json'):
+                caminho = os.path.join(self.diretorio, nome)
+                try:
+                    arquivos.append((os.path.getmtime(caminho), caminho))
+                except OSError:
+                    pass
+        if len(arquivos) <= self.tamanho_maximo:
+            return
+        arquivos.sort()
+        for _, caminho in arquivos[:len(arquivos) - self.tamanho_maximo]:
+            try:
+                os.remove(caminho)
+            except OSError:
+                pass
+
+    def resolver(self, num_pessoas, tam_barco, algoritmo):
+        """
+            Retorna a solução da configuração com o algoritmo informado (uma das chaves de
+            ALGORITMOS), consultando o cache antes de executar a busca. Quando não há solução
+            o caminho guardado é None.
+        """
+        registro = self.obter(num_pessoas, tam_barco, algoritmo)
+        if registro is not None:
+            return registro
+        instancia = Missionarios_Canibais(num_pessoas, tam_barco, RASTRO_NENHUM)
+        getattr(instancia, ALGORITMOS[algoritmo])()
+        caminho = [list(estado.chave()) for estado in instancia.solucao] if instancia.solucao else None
+        return self.guardar(num_pessoas, tam_barco, algoritmo, caminho, instancia.estatisticas)
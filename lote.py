@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import concurrent.futures
+import itertools
+import multiprocessing
+import signal
+import time
+
+from missionarios_canibais import *
+from cache_solucoes import CacheSolucoes
+
+# Folga do alarme de reserva em relação ao tempo limite das buscas (fator e segundos a mais):
+# o limite das próprias buscas deve ser atingido antes, para que elas terminem com a situação
+# ORCAMENTO_ESGOTADO e as estatísticas completas
+FATOR_FOLGA_ALARME = 1.5
+FOLGA_ALARME = 1.0
+
+# Situações possíveis de cada registro devolvido por resolver_lote, além de RESOLVIDO,
+# SEM_SOLUCAO e ORCAMENTO_ESGOTADO, que vêm das próprias buscas
+TEMPO_ESGOTADO = 'tempo_esgotado'
+CANCELADO = 'cancelado'
+ERRO = 'erro'
+
+
+class TempoEsgotado(Exception):
+    """
+        Lançada dentro do processo de trabalho quando uma busca passa do tempo limite.
+    """
+
+
+def interromper_busca(sinal, quadro):
+    raise TempoEsgotado()
+
+
+def criar_registro(num_pessoas, tam_barco, algoritmo, situacao, caminho=None, estatisticas=None, erro=None):
+    return {
+        'num_pessoas': num_pessoas,
+        'tam_barco': tam_barco,
+        'algoritmo': algoritmo,
+        'situacao': situacao,
+        'profundidade_solucao': len(caminho) - 1 if caminho else None,
+        'caminho': caminho,
+        'estatisticas': estatisticas or {},
+        'erro': erro,
+    }
+
+
+def resolver_configuracao(num_pessoas, tam_barco, algoritmo, limite_tempo=None, diretorio_cache=None, incluir_caminho=True,
+                          limite_estados=None):
+    """
+        Resolve uma única configuração e retorna o registro do resultado. É executada nos
+        processos de trabalho. limite_tempo e limite_estados formam o orçamento da busca, que
+        termina com a situação ORCAMENTO_ESGOTADO ao passar de um deles; como reserva para o
+        que não é contabilizado pelas buscas, o tempo limite também é garantido por SIGALRM,
+        disponível apenas em sistemas POSIX, com uma folga (ver FATOR_FOLGA_ALARME), e a
+        busca interrompida por ele termina com a situação TEMPO_ESGOTADO. Com orçamento a cache não é usada, para que
+        resultados interrompidos não sejam guardados.
+    """
+    alarme = limite_tempo is not None and hasattr(signal, 'setitimer')
+    if alarme:
+        signal.signal(signal.SIGALRM, interromper_busca)
+        signal.setitimer(signal.ITIMER_REAL, limite_tempo * FATOR_FOLGA_ALARME + FOLGA_ALARME)
+    inicio = time.time()
+    try:
+        if diretorio_cache is not None and limite_tempo is None and limite_estados is None:
+            resultado = CacheSolucoes(diretorio_cache).resolver(num_pessoas, tam_barco, algoritmo)
+            caminho = resultado['caminho']
+            estatisticas = resultado['estatisticas']
+        else:
+            instancia = Missionarios_Canibais(num_pessoas, tam_barco, RASTRO_NENHUM,
+                                              limite_estados=limite_estados, limite_tempo=limite_tempo)
+            resultado = instancia.resolver(algoritmo)
+            caminho = [list(chave) for chave in resultado.caminho] if resultado.caminho else None
+            estatisticas = resultado.estatisticas
+    except TempoEsgotado:
+        return criar_registro(num_pessoas, tam_barco, algoritmo, TEMPO_ESGOTADO,
+                              estatisticas={'tempo': time.time() - inicio})
+    except Exception as erro:
+        return criar_registro(num_pessoas, tam_barco, algoritmo, ERRO, erro=repr(erro))
+    finally:
+        if alarme:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    situacao = estatisticas.get('situacao', RESOLVIDO if caminho else SEM_SOLUCAO)
+    return criar_registro(num_pessoas, tam_barco, algoritmo, situacao,
+                          caminho if incluir_caminho else None, estatisticas)
+
+
+def resolver_lote(configuracoes, algoritmos=('astar',), max_processos=None, limite_tempo=None,
+                  cancelamento=None, diretorio_cache=None, incluir_caminho=True, limite_estados=None):
+    """
+        Resolve um conjunto de configuracoes, pares (num_pessoas, tam_barco), com cada um dos
+        algoritmos informados (chaves de ALGORITMOS), distribuindo as buscas em um pool de
+        processos. É um gerador: os registros (dicionários, ver criar_registro) são devolvidos
+        à medida que as buscas terminam, não na ordem de entrada.
+        limite_tempo é o tempo máximo, em segundos, e limite_estados o número máximo de
+        estados expandidos de cada busca (ver resolver_configuracao). cancelamento pode ser um
+        threading.Event: quando ele é ativado, as buscas enviadas ao pool que ainda não
+        começaram são canceladas e devolvidas com a situação CANCELADO, e as configurações
+        restantes são ignoradas. Fechar o gerador também cancela as buscas pendentes.
+        As configurações são consumidas aos poucos, mantendo no máximo duas buscas por
+        processo enviadas ao pool, então iteráveis muito grandes ou infinitos são aceitos.
+    """
+    for algoritmo in algoritmos:
+        if algoritmo not in ALGORITMOS:
+            raise ValueError('Algoritmo desconhecido: {}'.format(algoritmo))
+    trabalhos = ((num_pessoas, tam_barco, algoritmo)
+                 for num_pessoas, tam_barco in configuracoes for algoritmo in algoritmos)
+    processos = max_processos or multiprocessing.cpu_count()
+    executor = concurrent.futures.ProcessPoolExecutor(processos)
+    max_pendentes = 2 * processos
+    pendentes = {}
+    try:
+        while True:
+            cancelado = cancelamento is not None and cancelamento.is_set()
+            if not cancelado:
+                for trabalho in itertools.islice(trabalhos, max_pendentes - len(pendentes)):
+                    futuro = executor.submit(resolver_configuracao, *trabalho, limite_tempo=limite_tempo,
+                                             diretorio_cache=diretorio_cache, incluir_caminho=incluir_caminho,
+                                             limite_estados=limite_estados)
+                    pendentes[futuro] = trabalho
+            else:
+                for futuro in pendentes:
+                    futuro.cancel()
+            if not pendentes:
+                break
+            # A espera é curta para que o pedido de cancelamento seja percebido rapidamente
+            prontos, _ = concurrent.futures.wait(pendentes, timeout=0.1,
+                                                 return_when=concurrent.futures.FIRST_COMPLETED)
+            for futuro in prontos:
+                trabalho = pendentes.pop(futuro)
+                if futuro.cancelled():
+                    yield criar_registro(*trabalho, situacao=CANCELADO)
+                elif futuro.exception() is not None:
+                    yield criar_registro(*trabalho, situacao=ERRO, erro=repr(futuro.exception()))
+                else:
+                    yield futuro.result()
+    finally:
+        for futuro in pendentes:
+            futuro.cancel()
+        executor.shutdown(wait=False)
@@ -1,8 +1,338 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+from array import array
+import argparse
+import csv
+import heapq
+import itertools
+import json
+import sys
 import time
 
+# time.perf_counter é monotônico e tem a maior resolução disponível; o Python 2 só tem
+# time.time
+relogio = getattr(time, 'perf_counter', time.time)
+
+# Níveis de rastro das buscas
+RASTRO_NENHUM = 0
+RASTRO_RESUMO = 1
+RASTRO_COMPLETO = 2
+
+# Situação de uma busca terminada, guardada em estatisticas['situacao']
+RESOLVIDO = 'resolvido'
+SEM_SOLUCAO = 'sem_solucao'
+ORCAMENTO_ESGOTADO = 'orcamento_esgotado'
+
+# Entradas da tabela de transposição da busca em profundidade limitada por travessia do
+# limite, quando o tamanho da tabela não é informado. Cerca de duas por travessia bastam para
+# que a poda de estados repetidos seja tão eficaz quanto com uma tabela sem limite; o restante
+# é folga.
+TAMANHO_TABELA_POR_NIVEL = 8
+
+# Nomes dos algoritmos de busca e os métodos de Missionarios_Canibais que os executam
+ALGORITMOS = {
+    'largura': 'gerar_solucao_busca_largura',
+    'profundidade': 'gerar_solucao_busca_profundidade',
+    'gulosa': 'gerar_solucao_busca_gulosa',
+    'astar': 'gerar_solucao_busca_A',
+    'grafo': 'gerar_solucao_grafo',
+    'bidirecional': 'gerar_solucao_busca_bidirecional',
+    'aprofundamento_iterativo': 'gerar_solucao_busca_aprofundamento_iterativo',
+    'largura_vetorizada': 'gerar_solucao_busca_largura_vetorizada',
+    'analitico': 'gerar_solucao_analitica',
+}
+
+
+def gerar_movimentos(tam_barco, capacidade_minima=1):
+    """
+        Gera todas as cargas possíveis do barco, como pares (missionarios, canibais) com pelo
+        menos capacidade_minima (e ao menos uma) e no máximo tam_barco pessoas, para qualquer
+        tamanho de barco. As cargas maiores vêm primeiro.
+    """
+    movimentos = []
+    for pessoas in range(tam_barco, max(capacidade_minima, 1) - 1, -1):
+        for missionarios in range(pessoas, -1, -1):
+            movimentos.append((missionarios, pessoas - missionarios))
+    return tuple(movimentos)
+
+
+# Sequências ótimas de cargas (missionarios, canibais) dos casos clássicos com barcos de 2 e 3
+# lugares, alternando idas e voltas e começando por uma ida
+CARGAS_CONHECIDAS = {
+    (2, 2): ((1, 1), (1, 0), (2, 0), (1, 0), (1, 1)),
+    (3, 2): ((1, 1), (1, 0), (0, 2), (0, 1), (2, 0), (1, 1), (2, 0), (0, 1), (0, 2), (1, 0), (1, 1)),
+    (2, 3): ((2, 1), (2, 0), (2, 1)),
+    (3, 3): ((0, 3), (0, 2), (3, 0), (0, 1), (0, 3)),
+    (4, 3): ((0, 3), (0, 2), (2, 1), (1, 1), (3, 0), (0, 1), (0, 3), (0, 2), (0, 3)),
+    (5, 3): ((0, 3), (0, 2), (0, 3), (0, 1), (3, 0), (1, 1), (3, 0), (0, 2), (0, 3), (0, 1), (0, 3)),
+}
+
+
+def cargas_analiticas(num_pessoas, tam_barco):
+    """
+        Retorna a sequência ótima de cargas do barco para as configurações que têm solução
+        conhecida, sem fazer nenhuma busca:
+        - quando todos cabem no barco, uma única travessia;
+        - barcos de 2 lugares com até 3 pessoas e de 3 lugares com até 5, pela tabela
+          CARGAS_CONHECIDAS;
+        - barcos com um número par k >= 4 de lugares: cada ida leva k / 2 pares de
+          missionário e canibal e cada volta traz um par, mantendo as duas margens sempre
+          equilibradas, até que os restantes caibam no barco. São
+          2 * ceil((2N - k) / (k - 2)) + 1 travessias.
+        Retorna SEM_SOLUCAO quando se sabe que não há solução (barcos com menos de
+        2 lugares, de 2 lugares com mais de 3 pessoas ou de 3 lugares com mais de 5) e None
+        para as configurações não cobertas, que precisam de uma busca.
+    """
+    if num_pessoas == 0:
+        return ()
+    if tam_barco < 2 or (tam_barco == 2 and num_pessoas > 3) or (tam_barco == 3 and num_pessoas > 5):
+        return SEM_SOLUCAO
+    if 2 * num_pessoas <= tam_barco:
+        return ((num_pessoas, num_pessoas),)
+    if (num_pessoas, tam_barco) in CARGAS_CONHECIDAS:
+        return CARGAS_CONHECIDAS[(num_pessoas, tam_barco)]
+    if tam_barco % 2 == 0:
+        pares = tam_barco // 2
+        cargas = []
+        restantes = num_pessoas
+        while 2 * restantes > tam_barco:
+            cargas.append((pares, pares))
+            cargas.append((1, 1))
+            restantes -= pares - 1
+        cargas.append((restantes, restantes))
+        return tuple(cargas)
+    return None
+
+
+def regra_classica(missionarios, canibais):
+    """
+        Regra de segurança do problema clássico para uma margem: se houver missionários, os
+        canibais não podem ser mais numerosos que eles.
+    """
+    return missionarios == 0 or missionarios >= canibais
+
+
+class Problema():
+    """
+        Parâmetros de uma instância do problema, compartilhados por todos os estados gerados
+        durante a resolução: o número de missionários (num_pessoas) e de canibais (por padrão
+        o mesmo), as capacidades do barco e as tabelas de movimentos possíveis, calculadas uma
+        única vez por problema.
+        O barco leva de capacidade_minima a tam_barco pessoas nas idas e no máximo
+        capacidade_volta pessoas (por padrão tam_barco) nas voltas. regra_seguranca é uma
+        função (missionarios, canibais) que diz se uma margem é segura, aplicada às duas
+        margens; por padrão é a regra_classica, verificada diretamente em valido.
+        Com poda_dominancia, as buscas que partem da raiz só consideram as viagens de volta
+        com o menor número de pessoas possível (ver expandir).
+    """
+    __slots__ = ('num_pessoas', 'num_missionarios', 'num_canibais', 'tamanho_barco', 'capacidade_minima',
+                 'capacidade_volta', 'regra_seguranca', 'movimentos', 'movimentos_volta', 'poda_dominancia')
+
+    def __init__(self, num_pessoas, tam_barco, poda_dominancia=False, num_canibais=None, capacidade_minima=1,
+                 capacidade_volta=None, regra_seguranca=None):
+        self.num_pessoas = num_pessoas
+        self.num_missionarios = num_pessoas
+        self.num_canibais = num_pessoas if num_canibais is None else num_canibais
+        self.tamanho_barco = tam_barco
+        self.capacidade_minima = max(capacidade_minima, 1)
+        self.capacidade_volta = tam_barco if capacidade_volta is None else capacidade_volta
+        self.regra_seguranca = regra_seguranca
+        self.movimentos = gerar_movimentos(tam_barco, self.capacidade_minima)
+        if self.capacidade_volta == tam_barco:
+            self.movimentos_volta = self.movimentos
+        else:
+            self.movimentos_volta = gerar_movimentos(self.capacidade_volta, self.capacidade_minima)
+        self.poda_dominancia = poda_dominancia
+
+    def classico(self):
+        """
+            Indica se a instância é o problema clássico, com o mesmo número de missionários e
+            canibais, o mesmo barco nas idas e voltas e a regra de segurança clássica, que é o
+            caso coberto pelas soluções analíticas.
+        """
+        return (self.num_missionarios == self.num_canibais and self.capacidade_minima == 1 and
+                self.movimentos_volta is self.movimentos and self.regra_seguranca is None)
+
+    def simetrico(self):
+        """
+            Indica se toda travessia pode ser desfeita com a mesma carga no sentido contrário,
+            o que vale quando as cargas de ida e de volta são as mesmas. Nesse caso os
+            sucessores de um estado também são os seus antecessores.
+        """
+        return self.movimentos_volta is self.movimentos
+
+    def estado_inicial(self):
+        """
+            Retorna a raiz da árvore de estados: todos à esquerda do rio, junto com o barco.
+        """
+        return Estado(self, self.num_missionarios, self.num_canibais, 'esq')
+
+    def chave_inicial(self):
+        return (self.num_missionarios, self.num_canibais, 'esq')
+
+    def chave_final(self):
+        # Sem ninguém para atravessar, o problema já começa resolvido
+        if self.num_missionarios + self.num_canibais == 0:
+            return self.chave_inicial()
+        return (0, 0, 'dir')
+
+    def valido(self, missionarios_esq, canibais_esq):
+        """
+            Verifica se a configuração com missionarios_esq missionários e canibais_esq canibais
+            à esquerda do rio é válida, ou seja, não possue mais canibais que missionários em
+            nenhum lado do rio (ou, com regra_seguranca, se as duas margens são seguras).
+        """
+        missionarios_dir = self.num_missionarios - missionarios_esq
+        canibais_dir = self.num_canibais - canibais_esq
+        # Não se pode gerar estados onde o número de canibais ou missionários em qualquer lado
+        # do rio seja negativo
+        if ((missionarios_esq < 0) or (missionarios_dir < 0)
+            or (canibais_esq < 0) or (canibais_dir < 0)):
+            return False
+        if self.regra_seguranca is not None:
+            return (self.regra_seguranca(missionarios_esq, canibais_esq) and
+                    self.regra_seguranca(missionarios_dir, canibais_dir))
+        # Verifica se em ambas as margens do rio o número de missionários não é inferior ao número
+        # de canibais. Lembrando que caso não hajam missionários em um dos lados, não é necessário
+        # verificar o número de canibais nele.
+        return ((missionarios_esq == 0 or missionarios_esq >= canibais_esq) and
+                (missionarios_dir == 0 or missionarios_dir >= canibais_dir))
+
+    def caminho_cargas(self, cargas):
+        """
+            Aplica uma sequência de cargas do barco, alternando idas e voltas a partir da raiz,
+            e retorna o caminho de chaves percorrido.
+        """
+        missionarios_esq, canibais_esq, lado_rio = self.chave_inicial()
+        caminho = [(missionarios_esq, canibais_esq, lado_rio)]
+        for missionarios, canibais in cargas:
+            if lado_rio == 'esq':
+                missionarios_esq, canibais_esq, lado_rio = missionarios_esq - missionarios, canibais_esq - canibais, 'dir'
+            else:
+                missionarios_esq, canibais_esq, lado_rio = missionarios_esq + missionarios, canibais_esq + canibais, 'esq'
+            caminho.append((missionarios_esq, canibais_esq, lado_rio))
+        return caminho
+
+    def estados(self, caminho):
+        """
+            Converte um caminho de chaves em uma lista de estados encadeados pelo pai.
+        """
+        estados = []
+        pai = None
+        for missionarios_esq, canibais_esq, lado_rio in caminho:
+            estado = Estado(self, missionarios_esq, canibais_esq, lado_rio)
+            if pai is not None:
+                estado.pai = pai
+                estado.profundidade = pai.profundidade + 1
+            estados.append(estado)
+            pai = estado
+        return estados
+
+    def heuristica(self, chave):
+        """
+            Estimativa admissível e consistente do número de travessias que faltam para chegar
+            ao estado final. Cada viagem de ida leva no máximo tamanho_barco pessoas, mas toda
+            viagem de volta traz ao menos capacidade_minima, então cada ida e volta avança no
+            máximo tamanho_barco - capacidade_minima pessoas, e a última ida leva até
+            tamanho_barco pessoas.
+        """
+        missionarios_esq, canibais_esq, lado_rio = chave
+        pessoas_esq = missionarios_esq + canibais_esq
+        if pessoas_esq == 0:
+            return 0
+        travessias = 0
+        if lado_rio == 'dir':
+            # O barco ainda precisa voltar à margem esquerda trazendo ao menos uma pessoa
+            travessias = 1
+            pessoas_esq += self.capacidade_minima
+        if pessoas_esq <= self.tamanho_barco:
+            return travessias + 1
+        avanco = self.tamanho_barco - self.capacidade_minima
+        if avanco <= 0:
+            # Nenhuma ida e volta avança: como na travessia de uma pessoa por vez, cada ida é
+            # seguida de uma volta
+            return travessias + 2 * pessoas_esq - 1
+        idas_e_voltas = -(-(pessoas_esq - self.tamanho_barco) // avanco)
+        return travessias + 2 * idas_e_voltas + 1
+
+    def sucessores(self, chave):
+        """
+            Gera as chaves de todos os estados válidos alcançáveis a partir do estado com a
+            chave informada com uma única travessia. Se o problema for simétrico, estes
+            também são os antecessores do estado (ver antecessores).
+        """
+        missionarios_esq, canibais_esq, lado_rio = chave
+        if lado_rio == 'esq':
+            sinal = -1
+            novo_lado_rio = 'dir'
+            movimentos = self.movimentos
+        else:
+            sinal = 1
+            novo_lado_rio = 'esq'
+            movimentos = self.movimentos_volta
+        for missionarios, canibais in movimentos:
+            novo_missionarios_esq = missionarios_esq + sinal * missionarios
+            novo_canibais_esq = canibais_esq + sinal * canibais
+            if self.valido(novo_missionarios_esq, novo_canibais_esq):
+                yield (novo_missionarios_esq, novo_canibais_esq, novo_lado_rio)
+
+    def antecessores(self, chave):
+        """
+            Gera as chaves de todos os estados válidos a partir dos quais o estado com a chave
+            informada é alcançado com uma única travessia.
+        """
+        if self.simetrico():
+            for anterior in self.sucessores(chave):
+                yield anterior
+            return
+        missionarios_esq, canibais_esq, lado_rio = chave
+        # O barco chegou à margem em que está: pela direita com uma carga de ida, pela
+        # esquerda com uma carga de volta
+        if lado_rio == 'dir':
+            sinal, lado_anterior, movimentos = 1, 'esq', self.movimentos
+        else:
+            sinal, lado_anterior, movimentos = -1, 'dir', self.movimentos_volta
+        for missionarios, canibais in movimentos:
+            anterior_missionarios_esq = missionarios_esq + sinal * missionarios
+            anterior_canibais_esq = canibais_esq + sinal * canibais
+            if self.valido(anterior_missionarios_esq, anterior_canibais_esq):
+                yield (anterior_missionarios_esq, anterior_canibais_esq, lado_anterior)
+
+    def expandir(self, chave, anterior=None):
+        """
+            Sucessores usados pelas buscas que partem da raiz. A validade é verificada sobre
+            as contagens, antes de qualquer estado ser criado, e o estado anterior do caminho é
+            omitido, já que desfazer a última travessia nunca leva a um caminho mais curto.
+            Com poda_dominancia, as viagens de volta (do lado direito) usam apenas as cargas
+            válidas com o menor número de pessoas: trazer mais gente de volta do que o
+            necessário só atrasa a travessia. A poda reduz bastante a ramificação com barcos
+            grandes e manteve o número ótimo de travessias em todas as configurações
+            verificadas (até 200 pessoas e barcos de até 12 lugares), mas não tem prova
+            formal, por isso é opcional.
+        """
+        missionarios_esq, canibais_esq, lado_rio = chave
+        if lado_rio == 'esq':
+            for missionarios, canibais in self.movimentos:
+                if self.valido(missionarios_esq - missionarios, canibais_esq - canibais):
+                    filho = (missionarios_esq - missionarios, canibais_esq - canibais, 'dir')
+                    if filho != anterior:
+                        yield filho
+            return
+        # As cargas estão em ordem decrescente de pessoas; na volta com poda, a busca para no
+        # primeiro tamanho de carga que tiver algum movimento válido
+        pessoas_minimas = None
+        for missionarios, canibais in (reversed(self.movimentos_volta) if self.poda_dominancia else self.movimentos_volta):
+            if pessoas_minimas is not None and missionarios + canibais > pessoas_minimas:
+                return
+            if self.valido(missionarios_esq + missionarios, canibais_esq + canibais):
+                if self.poda_dominancia:
+                    pessoas_minimas = missionarios + canibais
+                filho = (missionarios_esq + missionarios, canibais_esq + canibais, 'esq')
+                if filho != anterior:
+                    yield filho
+
+
 class Estado():
     """
         Representa um estado dentro de uma árvore de estados para resolver o problema de
@@ -13,24 +343,42 @@ class Estado():
         rio (canibais_dir), o lado do rio (lado_rio), seu pai (pai) e seus filhos (filhos),
         além do numero de gerações até aquele estado. Um estado pode ser válido ou não,
         assim como pode ser a solução do problema ou não.
+        Como milhões de estados podem existir ao mesmo tempo, a classe usa __slots__ e guarda
+        apenas o lado esquerdo do rio: o lado direito é derivado do número de pessoas, que
+        fica junto com o tamanho do barco no Problema compartilhado.
     """
+    __slots__ = ('problema', 'missionarios_esq', 'canibais_esq', 'lado_rio', 'pai', 'filhos', 'profundidade')
 
-    def __init__(self, num_pessoas, missionarios_esq, missionarios_dir, canibais_esq, canibais_dir, lado_rio, tam_barco):
+    def __init__(self, problema, missionarios_esq, canibais_esq, lado_rio):
         """
             Inicializa um estado com as informações de quantidade de missionários e canibais de
             cada lado do rio, além da informação de em que lado do rio está o barco.
         """
-        self.tamanho_barco = tam_barco
-        self.num_pessoas = num_pessoas
+        self.problema = problema
         self.missionarios_esq = missionarios_esq
-        self.missionarios_dir = missionarios_dir
         self.canibais_esq = canibais_esq
-        self.canibais_dir = canibais_dir
         self.lado_rio = lado_rio
         self.pai = None
-        self.filhos = []
+        # Tupla vazia compartilhada até que os filhos sejam gerados, evitando uma lista por estado
+        self.filhos = ()
         self.profundidade = 0
 
+    @property
+    def num_pessoas(self):
+        return self.problema.num_pessoas
+
+    @property
+    def tamanho_barco(self):
+        return self.problema.tamanho_barco
+
+    @property
+    def missionarios_dir(self):
+        return self.problema.num_missionarios - self.missionarios_esq
+
+    @property
+    def canibais_dir(self):
+        return self.problema.num_canibais - self.canibais_esq
+
     def __str__(self):
         """
             Define a representação em string de um estado.
@@ -39,6 +387,14 @@ class Estado():
             self.missionarios_esq, self.missionarios_dir, self.lado_rio, self.canibais_esq, self.canibais_dir
         )
 
+    def chave(self):
+        """
+            Retorna uma chave canônica e hashable que identifica o estado. Como o número total
+            de pessoas é fixo, basta a quantidade de missionários e canibais à esquerda do rio
+            e o lado em que está o barco.
+        """
+        return (self.missionarios_esq, self.canibais_esq, self.lado_rio)
+
     def __eq__(self, estado2):
         if (self.missionarios_esq == estado2.missionarios_esq and
             self.missionarios_dir == estado2.missionarios_dir and
@@ -47,25 +403,19 @@ class Estado():
             self.lado_rio == estado2.lado_rio):
             return True
         return False
+
+    def __ne__(self, estado2):
+        return not self == estado2
+
+    def __hash__(self):
+        return hash(self.chave())
         
     def estado_valido(self):
         """
             Verifica se o estado é válido, ou seja, não possue mais canibais que missionários
             em nenhum lado do rio.
         """
-        # Não se pode gerar estados onde o número de canibais ou missionários em qualquer lado
-        # do rio seja negativo
-
-        if ((self.missionarios_esq < 0) or (self.missionarios_dir < 0)
-            or (self.canibais_esq < 0) or (self.canibais_dir < 0)):
-            return False
-        # Verifica se em ambas as margens do rio o número de missionários não é inferior ao número
-        # de canibais. Lembrando que caso não hajam missionários em um dos lados, não é necessário
-        # verificar o número de canibais nele.
-        
-        return ((self.missionarios_esq == 0 or self.missionarios_esq >= self.canibais_esq) and
-                (self.missionarios_dir == 0 or self.missionarios_dir >= self.canibais_dir))
-
+        return self.problema.valido(self.missionarios_esq, self.canibais_esq)
 
     def estado_final(self):
         """
@@ -73,92 +423,47 @@ class Estado():
             problema.
         """
         # Um estado é um estado final se todos os missionários e canibais atravessaram o rio
-        resultado_esq = self.missionarios_esq == self.canibais_esq == 0
-        resultado_dir = self.missionarios_dir == self.canibais_dir == self.num_pessoas
-        return resultado_esq and resultado_dir
+        return self.missionarios_esq == self.canibais_esq == 0
 
     #Calcula o valor deste estado usando a função f, que verifica o número de pessoas no lado origem do rio
     def custo_f(self):
         return self.missionarios_esq + self.canibais_esq
 
-    #Calcula o valor deste estado usando a função f, que verifica o número de missionarios no lado destino do rio, mais o número de geracões(a profundidade) para se atingir esse estado.
+    def heuristica(self):
+        """
+            Estimativa do número de travessias que faltam para chegar ao estado final (ver
+            Problema.heuristica).
+        """
+        return self.problema.heuristica(self.chave())
+
+    #Calcula o valor deste estado usando a função f do A*: o número de travessias já realizadas (a profundidade) mais a heurística.
     def custo_h(self):
-        return self.missionarios_dir + self.profundidade
+        return self.profundidade + self.heuristica()
     
+    def caminho(self):
+        """
+            Retorna a lista de estados desde a raiz da árvore até este estado.
+        """
+        caminho = [self]
+        estado = self
+        while estado.pai:
+            estado = estado.pai
+            caminho.append(estado)
+        caminho.reverse()
+        return caminho
+
     def gerar_filhos(self):
         """
-            Gera todos os possíveis filhos de um estado, se este for um estado válido e não
-            for um estado final.
-        """
-        # Encontra o novo lado do rio
-        novo_lado_rio = 'dir' if self.lado_rio == 'esq' else 'esq'
-        # Gera a lista de possíveis movimentos
-        if self.tamanho_barco == 2:
-            movimentos = [
-                {'missionarios': 2, 'canibais': 0},
-                {'missionarios': 1, 'canibais': 0},
-                {'missionarios': 1, 'canibais': 1},
-                {'missionarios': 0, 'canibais': 1},
-                {'missionarios': 0, 'canibais': 2},
-            ]
-        
-        elif self.tamanho_barco == 3:
-            movimentos = [
-                {'missionarios': 2, 'canibais': 0},
-                {'missionarios': 1, 'canibais': 0},
-                {'missionarios': 1, 'canibais': 1},
-                {'missionarios': 0, 'canibais': 1},
-                {'missionarios': 0, 'canibais': 2},
-                {'missionarios': 3, 'canibais': 0},
-                {'missionarios': 1, 'canibais': 2},
-                {'missionarios': 2, 'canibais': 1},
-                {'missionarios': 0, 'canibais': 3},
-            ]
-        elif self.tamanho_barco == 4:
-            movimentos = [
-                {'missionarios': 2, 'canibais': 0},
-                {'missionarios': 1, 'canibais': 0},
-                {'missionarios': 1, 'canibais': 1},
-                {'missionarios': 0, 'canibais': 1},
-                {'missionarios': 0, 'canibais': 2},
-                {'missionarios': 3, 'canibais': 0},
-                {'missionarios': 1, 'canibais': 2},
-                {'missionarios': 2, 'canibais': 1},
-                {'missionarios': 0, 'canibais': 3},
-                {'missionarios': 0, 'canibais': 4},
-                {'missionarios': 4, 'canibais': 0},
-                {'missionarios': 2, 'canibais': 2},
-                {'missionarios': 3, 'canibais': 1},
-                {'missionarios': 1, 'canibais': 3},
-            ]
-        else:
-            print "Tamanho do barco grande demais!!!"
-            return
-                
-        # Gera todos os possíveis estados e armazena apenas os válidos na lista de filhos
-        # do estado atual
-        for movimento in movimentos:
-            if self.lado_rio == 'esq':
-                # Se o barco estiver a esquerda do rio, os missionários e canibais saem da
-                # margem esquerda do rio e vão para a direita
-                missionarios_esq = self.missionarios_esq - movimento['missionarios']
-                missionarios_dir = self.missionarios_dir + movimento['missionarios']
-                canibais_esq = self.canibais_esq - movimento['canibais']
-                canibais_dir = self.canibais_dir + movimento['canibais']
-            else:
-                # Caso contrário, os missionários e canibais saem da margem direita do rio
-                # e vão para a esquerda
-                missionarios_dir = self.missionarios_dir - movimento['missionarios']
-                missionarios_esq = self.missionarios_esq + movimento['missionarios']
-                canibais_dir = self.canibais_dir - movimento['canibais']
-                canibais_esq = self.canibais_esq + movimento['canibais']
-            # Cria o estado do filho e caso este seja válido, o adiciona à lista de filhos do pai
-            filho = Estado(self.num_pessoas, missionarios_esq, missionarios_dir, canibais_esq,
-                           canibais_dir, novo_lado_rio, self.tamanho_barco)
+            Gera os filhos válidos de um estado (ver Problema.expandir). Apenas os filhos
+            válidos chegam a ser criados, e o pai deste estado não é gerado de novo.
+        """
+        anterior = self.pai.chave() if self.pai is not None else None
+        self.filhos = []
+        for missionarios_esq, canibais_esq, lado_rio in self.problema.expandir(self.chave(), anterior):
+            filho = Estado(self.problema, missionarios_esq, canibais_esq, lado_rio)
             filho.pai = self
             filho.profundidade = self.profundidade + 1
-            if filho.estado_valido():
-                self.filhos.append(filho)
+            self.filhos.append(filho)
 
 
 class Missionarios_Canibais():
@@ -166,62 +471,256 @@ class Missionarios_Canibais():
         Resolve o problema dos missionários e canibais, gerando para isso uma árvore de estados.
     """
 
-    def __init__(self, num_pessoas, tam_barco):
+    def __init__(self, num_pessoas, tam_barco, nivel_rastro=RASTRO_RESUMO, saida_rastro=None, limite_estados=None, limite_tempo=None,
+                 cancelamento=None, observadores=(), poda_dominancia=False, num_canibais=None, capacidade_minima=1,
+                 capacidade_volta=None, regra_seguranca=None):
         """
             Inicializa uma instância do problema com uma raiz pré-definida e ainda sem solução.
+            O rastro da execução das buscas é escrito em saida_rastro (qualquer objeto com um
+            método write, como um arquivo), de acordo com nivel_rastro: RASTRO_NENHUM não
+            escreve nada, RASTRO_RESUMO escreve apenas a solução e as estatísticas e
+            RASTRO_COMPLETO escreve também cada expansão à medida que ela acontece.
+            limite_estados e limite_tempo (em segundos) formam o orçamento de cada busca: ao
+            passar de um deles a busca é interrompida com a situação ORCAMENTO_ESGOTADO.
+            cancelamento pode ser um threading.Event: quando ele é ativado, por exemplo por
+            outra thread, a busca em andamento é interrompida da mesma forma.
+            observadores é uma lista de objetos avisados dos eventos de cada busca, com a
+            interface de observadores.Observador.
+            poda_dominancia liga a poda das viagens de volta (ver Problema.expandir) nas buscas
+            que partem da raiz.
+            num_canibais, capacidade_minima, capacidade_volta e regra_seguranca generalizam o
+            problema (ver Problema); num_pessoas é então o número de missionários.
         """
         
-        """ Insere a raiz na fila de execução, que será utilizada para fazer uma busca em largura; cria uma pilha de execução vazia que será usada na busca em profundidade;
-        e uma fronteira de estados, usada nas buscas heurísticas.
+        """ Insere a raiz na fila de execução, que será utilizada para fazer uma busca em largura; a pilha de execução, usada na busca em profundidade,
+        e a fronteira de estados (fila de prioridade), usada nas buscas heurísticas, são criadas por cada busca.
         """
         self.num_pessoas = num_pessoas
         self.tam_barco = tam_barco
-        self.fila = [Estado(self.num_pessoas, self.num_pessoas, 0, self.num_pessoas, 0, 'esq', self.tam_barco)]
+        self.nivel_rastro = nivel_rastro
+        self.saida_rastro = saida_rastro
+        self.limite_estados = limite_estados
+        self.limite_tempo = limite_tempo
+        self.cancelamento = cancelamento
+        self.observadores = list(observadores)
+        self.problema = Problema(num_pessoas, tam_barco, poda_dominancia, num_canibais, capacidade_minima,
+                                 capacidade_volta, regra_seguranca)
+        self.fila = [self.problema.estado_inicial()]
         self.pilha = None
-        self.fronteira_estados = [Estado(self.num_pessoas, self.num_pessoas, 0, self.num_pessoas, 0, 'esq', self.tam_barco)]
+        self.fronteira_estados = None
         self.solucao = []
+        self.estatisticas = {}
         self.numero_estados = 0
         self.estados_visitados = []
+        self.grafo_estados = None
+        self.viabilidade = None
+        self.resultados = {}
+        self.inicio_busca = None
+        self.estados_expandidos = 0
+        self.estados_gerados = 0
+        self.estados_descartados = 0
+        self.profundidade_maxima = 0
+        self.tamanho_maximo_fronteira = 0
+        self.orcamento_excedido = False
+
+    def iniciar_busca(self, cabecalho):
+        """
+            Escreve o cabeçalho da busca no rastro, zera os contadores e o orçamento e avisa os
+            observadores. Retorna o instante de início da busca.
+        """
+        self.escrever_rastro(RASTRO_COMPLETO, cabecalho)
+        self.solucao = []
+        self.estados_expandidos = 0
+        self.estados_gerados = 0
+        self.estados_descartados = 0
+        self.profundidade_maxima = 0
+        self.tamanho_maximo_fronteira = 0
+        self.orcamento_excedido = False
+        self.inicio_busca = time.time()
+        for observador in self.observadores:
+            observador.ao_iniciar(self, cabecalho)
+        return self.inicio_busca
+
+    def consumir_orcamento(self, quantidade=1):
+        """
+            Contabiliza a expansão de quantidade estados e retorna True se a busca passou do
+            limite de estados ou de tempo, ou foi cancelada, e deve ser interrompida.
+        """
+        self.estados_expandidos += quantidade
+        if ((self.limite_estados is not None and self.estados_expandidos > self.limite_estados) or
+                (self.limite_tempo is not None and time.time() - self.inicio_busca > self.limite_tempo) or
+                (self.cancelamento is not None and self.cancelamento.is_set())):
+            self.orcamento_excedido = True
+        return self.orcamento_excedido
 
-    def verifica(self, elemento, fila):
-        for i in fila:
-            if elemento == i:
+    def registrar_expansao(self, chave, profundidade):
+        """
+            Registra um estado retirado da fronteira para ser expandido, ou reconhecido como o
+            estado final, e consome o orçamento. Retorna True se a busca deve ser interrompida.
+            Todas as buscas contam os estados por meio destes métodos registrar_*, para que as
+            estatísticas tenham o mesmo significado em todos os algoritmos.
+        """
+        if profundidade > self.profundidade_maxima:
+            self.profundidade_maxima = profundidade
+        for observador in self.observadores:
+            observador.ao_expandir(self, chave, profundidade)
+        return self.consumir_orcamento()
+
+    def registrar_filho(self, chave, profundidade, aceito):
+        """
+            Registra um sucessor gerado durante uma expansão. aceito indica se ele entrou na
+            fronteira ou se foi descartado, por já ter sido alcançado ou por uma poda.
+        """
+        self.estados_gerados += 1
+        if not aceito:
+            self.estados_descartados += 1
+        for observador in self.observadores:
+            observador.ao_gerar(self, chave, profundidade)
+            if not aceito:
+                observador.ao_descartar(self, chave, profundidade)
+
+    def registrar_camada(self, expandidos, gerados, novos, profundidade):
+        """
+            Versão de registrar_expansao e registrar_filho para buscas que expandem uma camada
+            inteira de uma vez, como a busca vetorizada, sem avisar os observadores estado por
+            estado. Retorna True se a busca deve ser interrompida.
+        """
+        self.estados_gerados += gerados
+        self.estados_descartados += gerados - novos
+        if profundidade > self.profundidade_maxima:
+            self.profundidade_maxima = profundidade
+        self.registrar_fronteira(novos)
+        return self.consumir_orcamento(expandidos)
+
+    def registrar_fronteira(self, tamanho):
+        if tamanho > self.tamanho_maximo_fronteira:
+            self.tamanho_maximo_fronteira = tamanho
+
+    def viavel(self):
+        """
+            Verifica, antes de qualquer busca, se o problema tem solução. No problema clássico
+            os casos sem solução conhecidos são decididos em tempo constante por
+            cargas_analiticas, e barcos com 4 ou mais lugares sempre têm solução; nos demais
+            casos o estado final precisa ser alcançável no grafo de estados. Fora do problema
+            clássico, construir o grafo custaria tanto quanto a própria busca, então ele só é
+            consultado se já existir; senão a busca decide, ao esgotar a fronteira. Em qualquer
+            caso, a raiz e o estado final precisam ser válidos: com mais canibais que
+            missionários, ou com uma regra de segurança própria, eles podem não ser, e a busca
+            bidirecional, que parte do estado final, não teria como perceber. O resultado é
+            guardado para as buscas seguintes.
+        """
+        if self.viabilidade is None:
+            cargas = None
+            if self.problema.classico():
+                cargas = cargas_analiticas(self.problema.num_pessoas, self.problema.tamanho_barco)
+            if not all(self.problema.valido(*chave[:2])
+                       for chave in (self.problema.chave_inicial(), self.problema.chave_final())):
+                self.viabilidade = False
+            elif cargas == SEM_SOLUCAO:
+                self.viabilidade = False
+            elif cargas is not None or (self.problema.classico() and self.problema.tamanho_barco >= 4):
+                self.viabilidade = True
+            elif self.grafo_estados is None and (not self.problema.classico() or
+                                                 not self.cabe_no_orcamento(self.tamanho_espaco())):
                 return True
-        return False
+            else:
+                self.viabilidade = self.grafo().distancia(self.problema.chave_inicial()) is not None
+        return self.viabilidade
 
-    
-    #retorna o estado com menor valor na fronteira de estados. Variável estado_menor_custo indica o estado menos custoso, que irá gerar os próximos estados.
-    def menor_custo(self):
-        estado_menor_custo = self.fronteira_estados[0]
-        minimo = self.fronteira_estados[0].custo_f()
-        for estado in self.fronteira_estados:
-            if estado.custo_f() < minimo:
-                minimo = estado.custo_f()
-                estado_menor_custo = estado
-        return estado_menor_custo
-
-    #Retorna o estado com menor custo na funcao h, que verifica o numero de expansoes para se chegar até aquele estado
-    # e o numero de missionarios na margem de origem do rio.
-    
-    def menor_custo_h(self):
-        estado_menor_numero = self.fronteira_estados[0]
-        minimo = self.fronteira_estados[0].custo_h()
-        for estado in self.fronteira_estados:
-            if estado.custo_h() < minimo:
-                minimo = estado.missionarios_esq
-                estado_menor_custo = estado
-        return estado_menor_numero
-
-    def mostrar_resultados(self, solucao, string, profundidade_solucao, tempo, tamanho_fronteira, profundidade_maxima, numero_estados_visitados ):
+    def tamanho_espaco(self):
+        """
+            Número máximo de estados do problema: todas as combinações de missionários e
+            canibais à esquerda do rio, com o barco em cada margem.
+        """
+        return 2 * (self.problema.num_missionarios + 1) * (self.problema.num_canibais + 1)
+
+    def cabe_no_orcamento(self, estados):
+        return self.limite_estados is None or estados <= self.limite_estados
+
+    def sem_solucao(self, cabecalho, titulo_solucao, situacao, extras=()):
+        """
+            Formata o resultado de uma busca que terminou sem solução, seja porque o problema
+            não tem solução, seja porque o orçamento acabou.
+        """
+        return self.mostrar_resultados(cabecalho, titulo_solucao, [], None, time.time() - self.inicio_busca, extras, situacao)
+
+    def rastro_completo(self):
+        """
+            Indica se as expansões devem ser escritas no rastro. As buscas consultam este valor
+            antes de converter estados em texto, para que o rastro não custe nada quando está
+            desligado.
+        """
+        return self.saida_rastro is not None and self.nivel_rastro >= RASTRO_COMPLETO
+
+    def escrever_rastro(self, nivel, texto):
+        if self.saida_rastro is not None and self.nivel_rastro >= nivel:
+            self.saida_rastro.write(texto)
+
+    def escrever_expansao(self, elemento, filhos, nome_fronteira, tamanho_fronteira):
+        """
+            Escreve no rastro o estado expandido, os filhos que entraram na fronteira e o novo
+            tamanho da fronteira.
+        """
+        texto = "\n# Elemento Atual: \n" + str(elemento) + "\n\n"
+        texto += "-> Filhos gerados: \n"
+        for i in filhos:
+            texto += str(i) + "\n" + 60 * '-' + '\n'
+        texto += "\n-> " + nome_fronteira + " atualizada: " + str(tamanho_fronteira) + " estados\n"
+        self.saida_rastro.write(texto)
+
+    def mostrar_resultados(self, cabecalho, titulo_solucao, solucao, profundidade_solucao, tempo, extras=(), situacao=RESOLVIDO):
+        """
+            Formata apenas o caminho da solução e as estatísticas da busca, que também são
+            guardadas em self.estatisticas junto com os contadores registrados durante a busca.
+            extras é uma lista de estatísticas próprias de cada algoritmo, como tuplas
+            (descricao, nome, valor). Com RASTRO_NENHUM o texto não é montado e o retorno é uma
+            string vazia.
+            Em todos os algoritmos, estados_visitados conta os estados expandidos,
+            estados_gerados os sucessores válidos produzidos pelas expansões, sem a volta
+            imediata ao estado anterior, e estados_descartados os gerados que não entraram na
+            fronteira. A exceção é gerar_solucao_grafo, que conta a construção do grafo inteiro.
+        """
+        self.estatisticas = {
+            'situacao': situacao,
+            'profundidade_solucao': profundidade_solucao,
+            'profundidade_maxima': self.profundidade_maxima,
+            'estados_visitados': self.estados_expandidos,
+            'estados_gerados': self.estados_gerados,
+            'estados_descartados': self.estados_descartados,
+            'tempo': tempo,
+            'tamanho_maximo_fronteira': self.tamanho_maximo_fronteira,
+        }
+        for descricao, nome, valor in extras:
+            self.estatisticas[nome] = valor
+        for observador in self.observadores:
+            if solucao:
+                observador.ao_encontrar_solucao(self, solucao)
+            observador.ao_terminar(self, self.estatisticas)
+        if self.nivel_rastro == RASTRO_NENHUM:
+            return ''
+        string = "\n\n" + 8 * "#" + " " + titulo_solucao + ": " + 8 * "#" + "\n\n"
         for i in solucao:
             string += str(i) + '\n'
             string += 60 * '-' + '\n'
+        if situacao == SEM_SOLUCAO:
+            string += 'Nenhuma solucao encontrada: o problema nao tem solucao\n'
+        elif situacao == ORCAMENTO_ESGOTADO:
+            string += 'Busca interrompida: limite de estados, de tempo ou de profundidade atingido\n'
         string += '\nProfundidade da solucao: ' + str(profundidade_solucao) + '\n'
-        string += 'Profundidade maxima atingida: ' + str(profundidade_maxima) + '\n'
-        string += 'Total de estados visitados: ' + str(numero_estados_visitados) + '\n'
+        string += 'Profundidade maxima atingida: ' + str(self.profundidade_maxima) + '\n'
+        string += 'Total de estados visitados: ' + str(self.estados_expandidos) + '\n'
+        string += 'Total de estados gerados: ' + str(self.estados_gerados) + '\n'
+        string += 'Total de estados descartados: ' + str(self.estados_descartados) + '\n'
         string += 'Tempo de execucao total: ' + str(tempo) + ' segundos\n'
-        string += 'Tamanho maximo atingido pela fronteira de espaco de estados: ' + str(tamanho_fronteira) + '\n'
-        return string
+        string += 'Tamanho maximo atingido pela fronteira de espaco de estados: ' + str(self.tamanho_maximo_fronteira) + '\n'
+        for descricao, nome, valor in extras:
+            string += descricao + ': ' + str(valor) + '\n'
+        # No rastro completo o cabeçalho já foi escrito no início da busca
+        if self.rastro_completo():
+            self.escrever_rastro(RASTRO_RESUMO, string)
+        else:
+            self.escrever_rastro(RASTRO_RESUMO, cabecalho + string)
+        return cabecalho + string
 
 
     """
@@ -229,38 +728,38 @@ class Missionarios_Canibais():
         busca em largura, que utiliza uma FILA em sua execução.
     """
     def gerar_solucao_busca_largura(self):
-        string = "\t\t\tBUSCA EM LARGURA:\n"
-        numero_estados_visitados = 0
-        profundidade_maxima = 0
-        tamanho_maximo_fronteira = 0
-        inicio = time.time()
-        for elemento in self.fila:
-            string += "\n# Elemento Atual: \n" + str(elemento) + "\n\n"
-            numero_estados_visitados+=1
-            #self.solucao.append(elemento)
-            if elemento.profundidade > profundidade_maxima:
-                profundidade_maxima = elemento.profundidade
-            if len(self.fila) > tamanho_maximo_fronteira:
-                tamanho_maximo_fronteira = len(self.fila)
+        cabecalho = "\t\t\tBUSCA EM LARGURA:\n"
+        titulo_solucao = "SOLUCAO BUSCA EM LARGURA"
+        rastro_completo = self.rastro_completo()
+        inicio = self.iniciar_busca(cabecalho)
+        if not self.viavel():
+            return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO)
+        # Conjunto com as chaves de todos os estados que já entraram na fila, para que a
+        # verificação de estados repetidos seja O(1)
+        self.fila = [self.problema.estado_inicial()]
+        chaves_fila = set(estado.chave() for estado in self.fila)
+        # A fila nunca é esvaziada: os estados já visitados ficam antes da posição atual e a
+        # fronteira é apenas o restante da lista
+        for posicao, elemento in enumerate(self.fila):
+            self.registrar_fronteira(len(self.fila) - posicao)
+            if self.registrar_expansao(elemento.chave(), elemento.profundidade):
+                return self.sem_solucao(cabecalho, titulo_solucao, ORCAMENTO_ESGOTADO)
             if elemento.estado_final():
                 fim = time.time()
-                profundidade_solucao = elemento.profundidade
-                self.solucao = [elemento]
-                while elemento.pai:
-                    self.solucao.insert(0, elemento.pai)
-                    elemento = elemento.pai
-                string += "\n\n" + 8 * "#" + " SOLUCAO BUSCA EM LARGURA: " + 8 * "#" + "\n\n"
-                return self.mostrar_resultados(self.solucao, string, profundidade_solucao, fim-inicio, tamanho_maximo_fronteira, profundidade_maxima, numero_estados_visitados)
-                break;
+                self.solucao = elemento.caminho()
+                return self.mostrar_resultados(cabecalho, titulo_solucao, self.solucao, elemento.profundidade, fim-inicio)
             elemento.gerar_filhos()
-            string += "-> Filhos gerados: \n"
+            novos = []
             for i in elemento.filhos:
-                if not self.verifica(i, self.fila):
-                    string += str(i) + "\n" + 60 * '-' + '\n'
+                aceito = i.chave() not in chaves_fila
+                self.registrar_filho(i.chave(), i.profundidade, aceito)
+                if aceito:
+                    chaves_fila.add(i.chave())
                     self.fila.append(i)
-            string += "\n-> Fila atualizada: \n"
-            for i in self.fila:
-                string += str(i) + "\n" + 60 * '-' + '\n'
+                    novos.append(i)
+            if rastro_completo:
+                self.escrever_expansao(elemento, novos, "Fila", len(self.fila))
+        return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO)
         
         
     """
@@ -268,137 +767,546 @@ class Missionarios_Canibais():
         busca em profundidade, que utiliza uma PILHA em sua execução.
     """
     def gerar_solucao_busca_profundidade(self):
-        string = "\t\t\tBUSCA EM PROFUNDIDADE:\n"
+        cabecalho = "\t\t\tBUSCA EM PROFUNDIDADE:\n"
+        titulo_solucao = "SOLUCAO BUSCA EM PROFUNDIDADE"
+        rastro_completo = self.rastro_completo()
+        inicio = self.iniciar_busca(cabecalho)
+        if not self.viavel():
+            return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO)
         self.pilha = Pilha()
-        self.pilha.push(Estado(self.num_pessoas, self.num_pessoas, 0, self.num_pessoas, 0, 'esq', self.tam_barco))
-        numero_estados_visitados = 0
-        profundidade_maxima = 0
-        tamanho_maximo_fronteira = 0
-        inicio = time.time()
+        self.pilha.push(self.problema.estado_inicial())
+        # Chaves dos estados presentes na pilha e dos estados já visitados
+        self.estados_visitados = []
+        chaves_pilha = set(estado.chave() for estado in self.pilha.items)
+        chaves_visitados = set()
         while not self.pilha.isEmpty():
-            if len(self.pilha) > tamanho_maximo_fronteira:
-                tamanho_maximo_fronteira = len(self.pilha) 
+            self.registrar_fronteira(len(self.pilha))
             elemento = self.pilha.pop()
-            string += "\n# Elemento Atual: \n" + str(elemento) + "\n\n"
-            numero_estados_visitados+=1
-            if elemento.profundidade > profundidade_maxima:
-                profundidade_maxima = elemento.profundidade
+            chaves_pilha.discard(elemento.chave())
+            if self.registrar_expansao(elemento.chave(), elemento.profundidade):
+                return self.sem_solucao(cabecalho, titulo_solucao, ORCAMENTO_ESGOTADO)
             if elemento.estado_final():
                 # Se a solução foi encontrada, o caminho que compõe a solução é gerado realizando
                 # o caminho de volta até a raiz da árvore de estados e então encerra a busca
                 fim = time.time()
-                profundidade_solucao = elemento.profundidade
-                self.solucao = [elemento]
-                while elemento.pai:
-                    self.solucao.insert(0, elemento.pai)
-                    elemento = elemento.pai
-                string += "\n\n" + 8 * "#" + " SOLUCAO BUSCA EM PROFUNDIDADE: " + 8 * "#" + "\n\n"
-                return self.mostrar_resultados(self.solucao, string, profundidade_solucao, fim-inicio, tamanho_maximo_fronteira, profundidade_maxima, numero_estados_visitados)
-                break;
+                self.solucao = elemento.caminho()
+                return self.mostrar_resultados(cabecalho, titulo_solucao, self.solucao, elemento.profundidade, fim-inicio)
             self.estados_visitados.append(elemento)
+            chaves_visitados.add(elemento.chave())
             elemento.gerar_filhos()
-            string += "-> Filhos gerados: \n"
+            novos = []
             for i in elemento.filhos:
-                if not self.verifica(i, self.pilha.items):
-                    if not self.verifica(i, self.estados_visitados):
-                        string += str(i) + "\n" + 60 * '-' + '\n'
-                        self.pilha.push(i)
-            string += "\n-> Pilha atualizada: \n"
-            for i in self.pilha.items:
-                string += str(i) + "\n" + 60 * '-' + '\n'
+                aceito = i.chave() not in chaves_pilha and i.chave() not in chaves_visitados
+                self.registrar_filho(i.chave(), i.profundidade, aceito)
+                if aceito:
+                    chaves_pilha.add(i.chave())
+                    self.pilha.push(i)
+                    novos.append(i)
+            if rastro_completo:
+                self.escrever_expansao(elemento, novos, "Pilha", len(self.pilha))
+        return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO)
+
+
+    def gerar_solucao_busca_largura_vetorizada(self):
+        """
+            Busca em largura que processa cada camada inteira com operações vetorizadas do
+            NumPy (ver busca_vetorizada.busca_largura_vetorizada). Requer o NumPy instalado.
+            Os observadores não são avisados de cada estado, apenas do início e do fim da busca.
+        """
+        from busca_vetorizada import busca_largura_vetorizada
+        cabecalho = "\t\t\tBUSCA EM LARGURA VETORIZADA:\n"
+        titulo_solucao = "SOLUCAO BUSCA EM LARGURA VETORIZADA"
+        inicio = self.iniciar_busca(cabecalho)
+        if not self.viavel():
+            return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO)
+        self.registrar_fronteira(1)
+        caminho = busca_largura_vetorizada(self.problema, self.registrar_camada)
+        fim = time.time()
+        if caminho is None:
+            situacao = ORCAMENTO_ESGOTADO if self.orcamento_excedido else SEM_SOLUCAO
+            return self.sem_solucao(cabecalho, titulo_solucao, situacao)
+        self.solucao = self.problema.estados(caminho)
+        return self.mostrar_resultados(cabecalho, titulo_solucao, self.solucao, len(caminho) - 1, fim-inicio)
+
+    def gerar_solucao_analitica(self, algoritmo_reserva='astar'):
+        """
+            Monta a solução diretamente a partir de um padrão conhecido (ver
+            cargas_analiticas), em tempo proporcional ao tamanho do caminho, ou termina sem
+            solução de imediato quando se sabe que ela não existe. As configurações que nenhum padrão
+            cobre, incluindo todas as que não são o problema clássico, são resolvidas pelo
+            algoritmo_reserva, uma das chaves de ALGORITMOS.
+        """
+        cargas = None
+        if self.problema.classico():
+            cargas = cargas_analiticas(self.problema.num_pessoas, self.problema.tamanho_barco)
+        if cargas is None:
+            return getattr(self, ALGORITMOS[algoritmo_reserva])()
+        cabecalho = "\t\t\tSOLUCAO ANALITICA:\n"
+        inicio = self.iniciar_busca(cabecalho)
+        if cargas == SEM_SOLUCAO:
+            self.viabilidade = False
+            return self.sem_solucao(cabecalho, "SOLUCAO ANALITICA", SEM_SOLUCAO)
+        caminho = self.problema.caminho_cargas(cargas)
+        self.solucao = self.problema.estados(caminho)
+        self.profundidade_maxima = len(caminho) - 1
+        fim = time.time()
+        return self.mostrar_resultados(cabecalho, "SOLUCAO ANALITICA", self.solucao, len(caminho) - 1, fim-inicio)
+
+    def gerar_solucao_busca_bidirecional(self):
+        """
+            Busca em largura bidirecional: uma busca parte da raiz e outra do estado final, que
+            é conhecido, expandindo sempre a camada inteira do lado com a menor fronteira. O
+            lado do estado final segue as travessias ao contrário, pelos antecessores de cada
+            estado. Quando uma camada encontra um estado já alcançado pelo outro lado, a
+            camada é concluída e o menor caminho entre os encontros é a solução ótima.
+            A profundidade de cada estado é a sua distância até a origem do seu lado.
+        """
+        cabecalho = "\t\t\tBUSCA EM LARGURA BIDIRECIONAL:\n"
+        titulo_solucao = "SOLUCAO BUSCA EM LARGURA BIDIRECIONAL"
+        inicio = self.iniciar_busca(cabecalho)
+        if not self.viavel():
+            return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO)
+        # Para cada lado, o estado anterior no caminho (a partir da raiz ou até o estado
+        # final) e a distância de cada estado alcançado
+        lados = {
+            'inicio': {'pais': {self.problema.chave_inicial(): None}, 'distancias': {self.problema.chave_inicial(): 0},
+                       'fronteira': [self.problema.chave_inicial()], 'expandidos': 0,
+                       'vizinhos': self.problema.sucessores},
+            'fim': {'pais': {self.problema.chave_final(): None}, 'distancias': {self.problema.chave_final(): 0},
+                    'fronteira': [self.problema.chave_final()], 'expandidos': 0,
+                    'vizinhos': self.problema.antecessores},
+        }
+        self.registrar_fronteira(2)
+        # O encontro é guardado como (custo, estado do lado da raiz, estado do lado do estado
+        # final), sendo os dois estados vizinhos ou o mesmo estado
+        encontro = None
+        if self.problema.chave_inicial() == self.problema.chave_final():
+            encontro = (0, self.problema.chave_inicial(), self.problema.chave_final())
+        while encontro is None and lados['inicio']['fronteira'] and lados['fim']['fronteira']:
+            if len(lados['inicio']['fronteira']) <= len(lados['fim']['fronteira']):
+                nome, atual, outro = 'inicio', lados['inicio'], lados['fim']
+            else:
+                nome, atual, outro = 'fim', lados['fim'], lados['inicio']
+            nova_fronteira = []
+            for chave in atual['fronteira']:
+                distancia = atual['distancias'][chave] + 1
+                if self.registrar_expansao(chave, distancia - 1):
+                    break
+                atual['expandidos'] += 1
+                for filho in atual['vizinhos'](chave):
+                    if filho in outro['distancias']:
+                        custo = distancia + outro['distancias'][filho]
+                        if encontro is None or custo < encontro[0]:
+                            encontro = (custo, chave, filho) if nome == 'inicio' else (custo, filho, chave)
+                    aceito = filho not in atual['distancias']
+                    self.registrar_filho(filho, distancia, aceito)
+                    if aceito:
+                        atual['distancias'][filho] = distancia
+                        atual['pais'][filho] = chave
+                        nova_fronteira.append(filho)
+            if self.orcamento_excedido:
+                break
+            atual['fronteira'] = nova_fronteira
+            self.registrar_fronteira(len(lados['inicio']['fronteira']) + len(lados['fim']['fronteira']))
+            self.escrever_rastro(RASTRO_COMPLETO, "Camada {} do lado {}: {} estados na nova fronteira\n".format(
+                distancia, nome, len(nova_fronteira)))
+        fim = time.time()
+        extras = [('Estados expandidos a partir da raiz', 'estados_expandidos_inicio', lados['inicio']['expandidos']),
+                  ('Estados expandidos a partir do estado final', 'estados_expandidos_fim', lados['fim']['expandidos'])]
+        if self.orcamento_excedido:
+            return self.sem_solucao(cabecalho, titulo_solucao, ORCAMENTO_ESGOTADO, extras)
+        if encontro is None:
+            return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO, extras)
+        # O caminho é a sequência da raiz até o estado de encontro do lado da raiz, seguida da
+        # sequência do estado de encontro do outro lado até o estado final
+        _, chave_inicio, chave_fim = encontro
+        caminho = [chave_inicio]
+        while lados['inicio']['pais'][caminho[-1]] is not None:
+            caminho.append(lados['inicio']['pais'][caminho[-1]])
+        caminho.reverse()
+        if chave_fim != chave_inicio:
+            caminho.append(chave_fim)
+        while lados['fim']['pais'][caminho[-1]] is not None:
+            caminho.append(lados['fim']['pais'][caminho[-1]])
+        self.solucao = self.problema.estados(caminho)
+        return self.mostrar_resultados(cabecalho, titulo_solucao, self.solucao, len(caminho) - 1, fim-inicio, extras)
 
+    def sucessores_ordenados(self, chave, anterior=None):
+        """
+            Sucessores de um estado em ordem crescente de heurística, para que a busca em
+            profundidade siga primeiro os ramos mais promissores.
+        """
+        return iter(sorted(self.problema.expandir(chave, anterior), key=self.problema.heuristica))
+
+    def busca_profundidade_limitada(self, limite, tamanho_tabela=None):
+        """
+            Busca em profundidade a partir da raiz que só considera caminhos com no máximo
+            limite travessias. Usa apenas chaves de estados, uma pilha de geradores de
+            sucessores e uma tabela de transposição limitada, de forma que a memória é
+            O(limite + tamanho_tabela). Um estado só é
+            expandido se a sua profundidade mais a heurística (admissível) não passar do limite,
+            o que poda ramos que não podem chegar ao estado final a tempo sem perder soluções.
+            Estados repetidos são podados por uma tabela de transposição, que guarda a menor
+            profundidade em que cada estado foi alcançado e tem no máximo tamanho_tabela
+            entradas (por padrão, TAMANHO_TABELA_POR_NIVEL por travessia do limite, o que
+            mantém a memória proporcional à profundidade), além de não se repetir estados do
+            caminho atual. Quando a tabela está cheia, novos estados não entram nela. Cada expansão consome o
+            orçamento da busca (ver consumir_orcamento); quando ele acaba a busca para como se
+            não houvesse solução e self.orcamento_excedido indica a interrupção.
+            Retorna (caminho, proximo_limite, expandidos), onde caminho é a lista de chaves até
+            o estado final (ou None), proximo_limite é o menor custo que passou do limite, ou
+            None se nenhum estado foi podado pelo limite, e expandidos é o número de estados
+            expandidos nesta chamada.
+        """
+        raiz = self.problema.chave_inicial()
+        final = self.problema.chave_final()
+        if raiz == final:
+            return [raiz], None, 0
+        if self.problema.heuristica(raiz) > limite:
+            return None, self.problema.heuristica(raiz), 0
+        if tamanho_tabela is None:
+            tamanho_tabela = TAMANHO_TABELA_POR_NIVEL * (limite + 1)
+        tabela = {raiz: 0}
+        caminho = [raiz]
+        no_caminho = set(caminho)
+        pilha = [self.sucessores_ordenados(raiz)]
+        expandidos = 1
+        self.registrar_fronteira(1)
+        if self.registrar_expansao(raiz, 0):
+            return None, None, expandidos
+        proximo_limite = None
+        while pilha:
+            filho = next(pilha[-1], None)
+            if filho is None:
+                # Todos os sucessores do estado no topo já foram vistos: volta um nível
+                pilha.pop()
+                no_caminho.discard(caminho.pop())
+                continue
+            profundidade = len(caminho)
+            if filho in no_caminho:
+                self.registrar_filho(filho, profundidade, False)
+                continue
+            anterior = tabela.get(filho)
+            if anterior is not None and anterior <= profundidade:
+                self.registrar_filho(filho, profundidade, False)
+                continue
+            if filho == final:
+                self.registrar_filho(filho, profundidade, True)
+                caminho.append(filho)
+                return caminho, proximo_limite, expandidos
+            custo = profundidade + self.problema.heuristica(filho)
+            if custo > limite:
+                self.registrar_filho(filho, profundidade, False)
+                if proximo_limite is None or custo < proximo_limite:
+                    proximo_limite = custo
+                continue
+            self.registrar_filho(filho, profundidade, True)
+            if self.registrar_expansao(filho, profundidade):
+                return None, None, expandidos
+            if anterior is not None or len(tabela) < tamanho_tabela:
+                tabela[filho] = profundidade
+            caminho.append(filho)
+            no_caminho.add(filho)
+            pilha.append(self.sucessores_ordenados(filho, caminho[-2]))
+            expandidos += 1
+            self.registrar_fronteira(len(pilha))
+        return None, proximo_limite, expandidos
+
+    def gerar_solucao_busca_profundidade_limitada(self, limite, tamanho_tabela=None):
+        """
+            Encontra uma solução com no máximo limite travessias usando a busca em profundidade
+            limitada. Se ela não existir porque o limite podou algum estado, a situação da busca
+            é ORCAMENTO_ESGOTADO, já que um limite maior poderia encontrar a solução.
+        """
+        cabecalho = "\t\t\tBUSCA EM PROFUNDIDADE LIMITADA:\n"
+        titulo_solucao = "SOLUCAO BUSCA EM PROFUNDIDADE LIMITADA"
+        extras = [('Limite de profundidade', 'limite', limite)]
+        inicio = self.iniciar_busca(cabecalho)
+        if not self.viavel():
+            return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO, extras)
+        caminho, proximo_limite, _ = self.busca_profundidade_limitada(limite, tamanho_tabela)
+        fim = time.time()
+        if caminho is None:
+            situacao = ORCAMENTO_ESGOTADO if self.orcamento_excedido or proximo_limite is not None else SEM_SOLUCAO
+            return self.sem_solucao(cabecalho, titulo_solucao, situacao, extras)
+        self.solucao = self.problema.estados(caminho)
+        return self.mostrar_resultados(cabecalho, titulo_solucao, self.solucao, len(caminho) - 1, fim-inicio, extras)
+
+    def gerar_solucao_busca_aprofundamento_iterativo(self, limite_maximo=None, tamanho_tabela=None):
+        """
+            Busca em profundidade com aprofundamento iterativo: repete a busca em profundidade
+            limitada com limites crescentes até encontrar o estado final, o que garante o menor
+            número de travessias usando memória proporcional à profundidade. Em vez de somar
+            um ao limite, cada iteração usa o menor custo que passou do limite anterior, já que
+            nenhum limite intermediário poderia encontrar uma solução. A busca termina sem
+            solução quando nenhum estado é podado pelo limite, pois então todo o espaço
+            alcançável já foi explorado, ou quando o limite passa de limite_maximo.
+            Cada iteração percorre de novo os estados dentro do limite, então o tempo é bem
+            maior que o da busca em largura ou da A*: a vantagem é apenas a memória (ver
+            busca_profundidade_limitada e tamanho_tabela). As estatísticas somam todas as
+            iterações.
+        """
+        cabecalho = "\t\t\tBUSCA COM APROFUNDAMENTO ITERATIVO:\n"
+        titulo_solucao = "SOLUCAO APROFUNDAMENTO ITERATIVO"
+        inicio = self.iniciar_busca(cabecalho)
+        if not self.viavel():
+            return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO, [('Iteracoes', 'iteracoes', 0)])
+        iteracoes = 0
+        limite = 0
+        caminho = None
+        while limite is not None and (limite_maximo is None or limite <= limite_maximo):
+            caminho, proximo_limite, expandidos = self.busca_profundidade_limitada(limite, tamanho_tabela)
+            iteracoes += 1
+            self.escrever_rastro(RASTRO_COMPLETO, "Limite de profundidade {}: {} estados expandidos\n".format(limite, expandidos))
+            if caminho is not None or self.orcamento_excedido:
+                break
+            limite = proximo_limite
+        fim = time.time()
+        extras = [('Iteracoes', 'iteracoes', iteracoes)]
+        if caminho is None:
+            situacao = ORCAMENTO_ESGOTADO if self.orcamento_excedido or limite is not None else SEM_SOLUCAO
+            return self.sem_solucao(cabecalho, titulo_solucao, situacao, extras)
+        self.solucao = self.problema.estados(caminho)
+        return self.mostrar_resultados(cabecalho, titulo_solucao, self.solucao, len(caminho) - 1, fim-inicio, extras)
+
+    def busca_melhor_escolha(self, cabecalho, titulo_solucao, custo):
+        """
+            Busca pela melhor escolha: expande sempre o estado da fronteira com o menor valor
+            da função custo, recebida como parâmetro. A fronteira é uma fila de prioridade
+            (heap binário), então cada expansão custa O(log n).
+        """
+        rastro_completo = self.rastro_completo()
+        inicio = self.iniciar_busca(cabecalho)
+        if not self.viavel():
+            return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO)
+        raiz = self.problema.estado_inicial()
+        self.fronteira_estados = FronteiraPrioridade()
+        self.fronteira_estados.push(raiz, custo(raiz))
+        chaves_visitados = set()
+        while self.fronteira_estados:
+            self.registrar_fronteira(len(self.fronteira_estados))
+            # O estado de menor custo da fronteira é retirado e expandido
+            elemento = self.fronteira_estados.pop()
+            if self.registrar_expansao(elemento.chave(), elemento.profundidade):
+                return self.sem_solucao(cabecalho, titulo_solucao, ORCAMENTO_ESGOTADO)
+            if elemento.estado_final():
+                fim = time.time()
+                # Se a solução foi encontrada, o caminho que compõe a solução é gerado realizando
+                # o caminho de volta até a raiz da árvore de estados e então encerra a busca
+                self.solucao = elemento.caminho()
+                return self.mostrar_resultados(cabecalho, titulo_solucao, self.solucao, elemento.profundidade, fim-inicio)
+            chaves_visitados.add(elemento.chave())
+            elemento.gerar_filhos()
+            novos = []
+            for i in elemento.filhos:
+                # Filhos já presentes na fronteira só são atualizados se o novo custo for menor
+                aceito = i.chave() not in chaves_visitados and self.fronteira_estados.push(i, custo(i))
+                self.registrar_filho(i.chave(), i.profundidade, aceito)
+                if aceito:
+                    novos.append(i)
+            if rastro_completo:
+                self.escrever_expansao(elemento, novos, "Fronteira de espaco de estados", len(self.fronteira_estados))
+        return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO)
 
     def gerar_solucao_busca_gulosa(self):
-        string = "\t\t\tBUSCA PELA HEURISTICA GULOSA:\n"
-        estados_visitados = []
-        #solucao =[]
-        numero_estados_visitados = 0
-        profundidade_maxima = 0
-        tamanho_maximo_fronteira = 0
-        inicio = time.time()
-        while not self.solucao:
-            for elemento in self.fronteira_estados:
-                numero_estados_visitados+=1
-                #solucao.append(elemento)
-                if elemento.profundidade > profundidade_maxima:
-                    profundidade_maxima = elemento.profundidade
-                if len(self.fronteira_estados) > tamanho_maximo_fronteira:
-                    tamanho_maximo_fronteira = len(self.fronteira_estados)
-                if elemento.estado_final():
-                    fim = time.time()
-                    profundidade_solucao = elemento.profundidade
-                    # Se a solução foi encontrada, o caminho que compõe a solução é gerado realizando
-                    # o caminho de volta até a raiz da árvore de estados e então encerra a busca
-                    self.solucao = [elemento]
-                    while elemento.pai:
-                        self.solucao.insert(0, elemento.pai)
-                        elemento = elemento.pai
-                    string += "\n\n" + 8 * "#" + " SOLUCAO HEURISTICA GULOSA: " + 8 * "#" + "\n\n"
-                    return self.mostrar_resultados(self.solucao, string, profundidade_solucao, fim-inicio, tamanho_maximo_fronteira, profundidade_maxima,
-                            numero_estados_visitados)
-                    break;
-                estados_visitados.append(elemento)
-                 #Caso não seja encontrado o estado final, o estado menor custo da fronteira é expandido e a busca continua.
-            estado_menor_custo = self.menor_custo()
-            string += "\n# Elemento Atual: \n" + str(estado_menor_custo) + "\n\n"
-            estado_menor_custo.gerar_filhos()
-            string += "-> Filhos gerados: \n"
-            #self.fronteira_estados = []
-            for i in estado_menor_custo.filhos:
-                if not self.verifica(i, estados_visitados) and not self.verifica(i, self.fronteira_estados):
-                    string += str(i) + "\n" + 60 * '-' + '\n'
-                    self.fronteira_estados.append(i)
-            self.fronteira_estados.remove(estado_menor_custo)
-            string += "\n-> Fronteira de espaco de estados atualizada: \n"
-            for i in self.fronteira_estados:
-                string += str(i) + "\n" + 60 * '-' + '\n'
+        cabecalho = "\t\t\tBUSCA PELA HEURISTICA GULOSA:\n"
+        return self.busca_melhor_escolha(cabecalho, "SOLUCAO HEURISTICA GULOSA", Estado.custo_f)
 
-        
     def gerar_solucao_busca_A(self):
-        string = "\t\t\tBUSCA PELA HEURISTICA A*:\n"
-        estados_visitados = []
-        #solucao = []
-        numero_estados_visitados = 0
-        profundidade_maxima = 0
-        tamanho_maximo_fronteira = 0
-        inicio = time.time()
-        while not self.solucao:
-            for elemento in self.fronteira_estados:
-                numero_estados_visitados+=1
-                #solucao.append(elemento)
-                if elemento.profundidade > profundidade_maxima:
-                    profundidade_maxima = elemento.profundidade
-                if len(self.fronteira_estados) > tamanho_maximo_fronteira:
-                    tamanho_maximo_fronteira = len(self.fronteira_estados)
-                if elemento.estado_final():
-                    fim = time.time()
-                    profundidade_solucao = elemento.profundidade
-                    # Se a solução foi encontrada, o caminho que compõe a solução é gerado realizando
-                    # o caminho de volta até a raiz da árvore de estados e então encerra a busca
-                    self.solucao = [elemento]
-                    while elemento.pai:
-                        self.solucao.insert(0, elemento.pai)
-                        elemento = elemento.pai
-                    string += "\n\n" + 8 * "#" + " SOLUCAO HEURISTICA A*: " + 8 * "#" + "\n\n"
-                    return self.mostrar_resultados(self.solucao, string, profundidade_solucao, fim-inicio, tamanho_maximo_fronteira, profundidade_maxima,
-                            numero_estados_visitados)
-                    break;
-                estados_visitados.append(elemento)
-                 #Caso não seja encontrado o estado final, o estado menor custo da fronteira é expandido e a busca continua.
-            estado_menor_custo = self.menor_custo_h()
-            string += "\n# Elemento Atual: \n" + str(estado_menor_custo) + "\n\n"
-            estado_menor_custo.gerar_filhos()
-            string += "-> Filhos gerados: \n"
-            for i in estado_menor_custo.filhos:
-                if not self.verifica(i, self.fronteira_estados) and not self.verifica(i, estados_visitados):
-                    string += str(i) + "\n" + 60 * '-' + '\n'
-                    self.fronteira_estados.append(i) 
-            self.fronteira_estados.remove(estado_menor_custo)
-            string += "\n-> Fronteira de espaco de estados atualizada: \n"
-            for i in self.fronteira_estados:
-                string += str(i) + "\n" + 60 * '-' + '\n'
-                
-            
+        cabecalho = "\t\t\tBUSCA PELA HEURISTICA A*:\n"
+        # Empates no custo f são desfeitos a favor do estado mais profundo, que está mais
+        # próximo da solução
+        return self.busca_melhor_escolha(cabecalho, "SOLUCAO HEURISTICA A*",
+                                         lambda estado: (estado.custo_h(), -estado.profundidade))
+
+
+    def resolver(self, algoritmo='astar', **argumentos):
+        """
+            Resolve o problema com o algoritmo informado (uma das chaves de ALGORITMOS) e
+            retorna um Resultado, sem que seja preciso interpretar o texto da busca. Os
+            argumentos extras são repassados ao método de busca. Cada busca começa do zero,
+            então algoritmos diferentes podem ser usados em sequência na mesma instância, que
+            reaproveita entre as chamadas o que não depende do algoritmo: a verificação de
+            viabilidade e o grafo de estados. Ao final, a árvore e a fronteira da busca são
+            liberadas, e self.solucao passa a ser o caminho do Resultado, sem os demais estados
+            gerados.
+            Resultados completos (com ou sem solução) também são guardados por algoritmo,
+            argumentos e orçamento (limite_estados e limite_tempo) e devolvidos diretamente nas
+            chamadas seguintes, sem uma nova busca e, portanto, sem avisar os observadores;
+            buscas interrompidas pelo orçamento não são guardadas.
+        """
+        if algoritmo not in ALGORITMOS:
+            raise ValueError('Algoritmo desconhecido: {}'.format(algoritmo))
+        chave = (algoritmo, tuple(sorted(argumentos.items())), self.limite_estados, self.limite_tempo)
+        resultado = self.resultados.get(chave)
+        if resultado is not None:
+            return resultado
+        inicio = relogio()
+        texto = getattr(self, ALGORITMOS[algoritmo])(**argumentos)
+        caminho = [estado.chave() for estado in self.solucao] if self.solucao else None
+        self.liberar_busca()
+        resultado = Resultado(algoritmo, caminho, self.problema.estados(caminho or ()), self.estatisticas,
+                              relogio() - inicio, texto)
+        self.solucao = resultado.estados
+        if resultado.situacao != ORCAMENTO_ESGOTADO:
+            self.resultados[chave] = resultado
+        return resultado
+
+    def liberar_busca(self):
+        """
+            Descarta a fronteira e os estados visitados da última busca, que mantêm viva toda a
+            árvore de estados gerada por ela.
+        """
+        self.fila = [self.problema.estado_inicial()]
+        self.pilha = None
+        self.fronteira_estados = None
+        self.estados_visitados = []
+
+    def caminho_otimo(self, origem=None):
+        """
+            Retorna a lista de chaves de um caminho ótimo do estado origem (por padrão a raiz)
+            até o estado final, ou None se não houver caminho, consultando o grafo de estados.
+            Depois da primeira consulta cada nova origem custa apenas o tamanho do caminho.
+        """
+        return self.grafo().caminho(self.problema.chave_inicial() if origem is None else origem)
+
+    def grafo(self):
+        """
+            Retorna o grafo completo de estados desta instância, construído na primeira chamada
+            e reaproveitado nas seguintes.
+        """
+        if self.grafo_estados is None:
+            self.grafo_estados = GrafoEstados(self.problema)
+        return self.grafo_estados
+
+    def gerar_solucao_grafo(self):
+        """
+            Encontra a solução ótima consultando a tabela de distâncias até o estado final do
+            grafo completo de estados. Depois que o grafo foi construído, cada consulta custa
+            apenas o tamanho do caminho. O grafo não é construído se o número máximo de estados
+            do problema passar do limite de estados. As estatísticas são as da construção do
+            grafo, que percorre o espaço inteiro: todos os estados contam como expandidos e
+            todas as arestas como geradas, inclusive as de volta ao estado anterior, já que o
+            grafo guarda todas elas, e as que não levam a um estado novo como descartadas.
+        """
+        cabecalho = "\t\t\tBUSCA NO GRAFO DE ESTADOS:\n"
+        titulo_solucao = "SOLUCAO GRAFO DE ESTADOS"
+        inicio = self.iniciar_busca(cabecalho)
+        if not self.viavel():
+            return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO)
+        if self.grafo_estados is None and not self.cabe_no_orcamento(self.tamanho_espaco()):
+            self.orcamento_excedido = True
+            return self.sem_solucao(cabecalho, titulo_solucao, ORCAMENTO_ESGOTADO)
+        grafo = self.grafo()
+        self.estados_expandidos = len(grafo)
+        self.estados_gerados = len(grafo.adjacencia)
+        self.estados_descartados = len(grafo.adjacencia) - (len(grafo) - 1)
+        self.registrar_fronteira(grafo.tamanho_maximo_fronteira)
+        caminho = grafo.caminho(self.problema.chave_inicial())
+        fim = time.time()
+        if caminho is None:
+            return self.sem_solucao(cabecalho, titulo_solucao, SEM_SOLUCAO)
+        self.profundidade_maxima = len(caminho) - 1
+        self.solucao = grafo.estados(caminho)
+        return self.mostrar_resultados(cabecalho, titulo_solucao, self.solucao, len(caminho) - 1, fim-inicio)
+
+
+class Resultado():
+    """
+        Resultado estruturado de uma busca (ver Missionarios_Canibais.resolver): o algoritmo
+        usado, a situação da busca (RESOLVIDO, SEM_SOLUCAO ou ORCAMENTO_ESGOTADO), o caminho
+        como lista de chaves (missionarios_esq, canibais_esq, lado_rio), ou None sem solução,
+        os estados correspondentes, encadeados apenas pelo pai e sem os demais estados
+        gerados pela busca, as estatísticas da busca, o tempo total da chamada em segundos,
+        incluindo a preparação da busca, e o texto gerado, vazio com RASTRO_NENHUM.
+    """
+    __slots__ = ('algoritmo', 'situacao', 'caminho', 'estados', 'estatisticas', 'tempo_total', 'texto')
+
+    def __init__(self, algoritmo, caminho, estados, estatisticas, tempo_total, texto=''):
+        self.algoritmo = algoritmo
+        self.situacao = estatisticas['situacao']
+        self.caminho = caminho
+        self.estados = estados
+        self.estatisticas = dict(estatisticas)
+        self.tempo_total = tempo_total
+        self.texto = texto
+
+    @property
+    def resolvido(self):
+        return self.situacao == RESOLVIDO
+
+    @property
+    def profundidade(self):
+        return self.estatisticas['profundidade_solucao']
+
+    def como_dicionario(self):
+        """
+            Retorna o resultado como um dicionário serializável em JSON, com o caminho como
+            listas [missionarios_esq, canibais_esq, lado_rio].
+        """
+        return {
+            'algoritmo': self.algoritmo,
+            'situacao': self.situacao,
+            'caminho': [list(chave) for chave in self.caminho] if self.caminho is not None else None,
+            'estatisticas': self.estatisticas,
+            'tempo_total': self.tempo_total,
+        }
+
+
+class FronteiraPrioridade():
+    """
+        Fila de prioridade de estados baseada em heap binário (heapq). Cada estado aparece no
+        máximo uma vez na fronteira, identificado pela sua chave. Quando um estado já presente
+        é inserido novamente com prioridade menor, a entrada antiga é marcada como removida
+        (remoção preguiçosa) e uma nova é inserida. Empates são desfeitos pela ordem de
+        inserção, o que torna a busca determinística.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.entradas = {}
+        self.contador = itertools.count()
+
+    #quantidade de estados na fronteira
+    def __len__(self):
+        return len(self.entradas)
+
+    #percorre os estados da fronteira, na ordem interna do heap
+    def __iter__(self):
+        for entrada in self.heap:
+            if entrada[2] is not None:
+                yield entrada[2]
+
+    #verifica se um estado está na fronteira
+    def __contains__(self, estado):
+        return estado.chave() in self.entradas
+
+    def push(self, estado, prioridade):
+        """
+            Insere o estado com a prioridade informada, ou diminui a prioridade de um estado
+            já presente. Retorna True se a fronteira foi alterada.
+        """
+        chave = estado.chave()
+        entrada = self.entradas.get(chave)
+        if entrada is not None:
+            if entrada[0] <= prioridade:
+                return False
+            entrada[2] = None
+        entrada = [prioridade, next(self.contador), estado]
+        self.entradas[chave] = entrada
+        heapq.heappush(self.heap, entrada)
+        return True
+
+    #retira o estado de menor prioridade
+    def pop(self):
+        while self.heap:
+            estado = heapq.heappop(self.heap)[2]
+            if estado is not None:
+                del self.entradas[estado.chave()]
+                return estado
+        raise IndexError('pop de uma fronteira vazia')
+
+
 class Pilha():
     def __init__(self) :
         self.items = []
@@ -418,3 +1326,187 @@ class Pilha():
     #verifica se a pilha esta vazia
     def isEmpty(self) :
         return (self.items == [])
+
+
+class GrafoEstados():
+    """
+        Grafo completo dos estados alcançáveis a partir da raiz de um problema. Os estados são
+        numerados na ordem em que são encontrados e as arestas ficam em dois arrays compactos
+        (formato CSR): os vizinhos do estado i são
+        adjacencia[inicio_adjacencia[i]:inicio_adjacencia[i + 1]].
+        Uma única busca em largura a partir do estado final, seguindo as arestas ao contrário,
+        gera a distância de todos os estados até a solução, e o caminho ótimo a partir de
+        qualquer estado é obtido seguindo vizinhos com distância decrescente. Se o problema for
+        simétrico as arestas de volta são as mesmas; caso contrário ficam em outro par de
+        arrays CSR (inicio_antecessores e antecessores).
+    """
+
+    def __init__(self, problema):
+        self.problema = problema
+        self.chaves = [problema.chave_inicial()]
+        self.indices = {self.chaves[0]: 0}
+        self.inicio_adjacencia = array('i', [0])
+        self.adjacencia = array('i')
+        self.tamanho_maximo_fronteira = 1
+        # Enumera todos os estados alcançáveis com uma busca em largura
+        atual = 0
+        while atual < len(self.chaves):
+            for chave in problema.sucessores(self.chaves[atual]):
+                indice = self.indices.get(chave)
+                if indice is None:
+                    indice = len(self.chaves)
+                    self.indices[chave] = indice
+                    self.chaves.append(chave)
+                self.adjacencia.append(indice)
+            self.inicio_adjacencia.append(len(self.adjacencia))
+            atual += 1
+            if len(self.chaves) - atual > self.tamanho_maximo_fronteira:
+                self.tamanho_maximo_fronteira = len(self.chaves) - atual
+        if problema.simetrico():
+            self.inicio_antecessores, self.antecessores = self.inicio_adjacencia, self.adjacencia
+        else:
+            self.inverter_arestas()
+        self.distancias_destino = {}
+        self.distancias = self.distancias_para(problema.chave_final())
+
+    def inverter_arestas(self):
+        """
+            Monta a lista de antecessores de cada estado, em formato CSR, a partir das arestas
+            de ida: conta quantas arestas chegam a cada estado e depois as distribui.
+        """
+        contagem = array('i', [0]) * (len(self.chaves) + 1)
+        for destino in self.adjacencia:
+            contagem[destino + 1] += 1
+        for indice in range(len(self.chaves)):
+            contagem[indice + 1] += contagem[indice]
+        self.inicio_antecessores = array('i', contagem)
+        self.antecessores = array('i', [0]) * len(self.adjacencia)
+        for origem in range(len(self.chaves)):
+            for destino in self.vizinhos(origem):
+                self.antecessores[contagem[destino]] = origem
+                contagem[destino] += 1
+
+    #quantidade de estados no grafo
+    def __len__(self):
+        return len(self.chaves)
+
+    def vizinhos(self, indice):
+        return self.adjacencia[self.inicio_adjacencia[indice]:self.inicio_adjacencia[indice + 1]]
+
+    def distancias_para(self, destino):
+        """
+            Retorna um array com a distância de cada estado do grafo até o destino, ou -1 para
+            os estados que não o alcançam. Os arrays são guardados por destino, de forma que
+            consultas repetidas entre quaisquer pares de estados não refazem a busca.
+        """
+        distancias = self.distancias_destino.get(destino)
+        if distancias is not None:
+            return distancias
+        distancias = array('i', [-1]) * len(self.chaves)
+        indice = self.indices.get(destino)
+        if indice is not None:
+            distancias[indice] = 0
+            fila = [indice]
+            for atual in fila:
+                for vizinho in self.antecessores[self.inicio_antecessores[atual]:self.inicio_antecessores[atual + 1]]:
+                    if distancias[vizinho] < 0:
+                        distancias[vizinho] = distancias[atual] + 1
+                        fila.append(vizinho)
+        self.distancias_destino[destino] = distancias
+        return distancias
+
+    def distancia(self, origem, destino=None):
+        """
+            Número mínimo de travessias entre os estados origem e destino (por padrão o estado
+            final), ou None se não houver caminho.
+        """
+        distancias = self.distancias if destino is None else self.distancias_para(destino)
+        indice = self.indices.get(origem)
+        if indice is None or distancias[indice] < 0:
+            return None
+        return distancias[indice]
+
+    def caminho(self, origem, destino=None):
+        """
+            Retorna a lista de chaves de um caminho ótimo entre os estados origem e destino
+            (por padrão o estado final), ou None se não houver caminho.
+        """
+        distancias = self.distancias if destino is None else self.distancias_para(destino)
+        indice = self.indices.get(origem)
+        if indice is None or distancias[indice] < 0:
+            return None
+        caminho = [self.chaves[indice]]
+        while distancias[indice] > 0:
+            for vizinho in self.vizinhos(indice):
+                if distancias[vizinho] == distancias[indice] - 1:
+                    indice = vizinho
+                    break
+            caminho.append(self.chaves[indice])
+        return caminho
+
+    def estados(self, caminho):
+        return self.problema.estados(caminho)
+
+
+# Códigos de saída da linha de comando para cada situação da busca; erros de uso saem com 2
+CODIGOS_SAIDA = {
+    RESOLVIDO: 0,
+    SEM_SOLUCAO: 1,
+    ORCAMENTO_ESGOTADO: 3,
+}
+
+# Colunas da saída em CSV: uma linha por execução, com o caminho em uma única coluna
+COLUNAS_CSV = ('num_pessoas', 'num_canibais', 'tam_barco', 'algoritmo', 'situacao', 'profundidade_solucao', 'profundidade_maxima',
+               'estados_visitados', 'estados_gerados', 'estados_descartados', 'tamanho_maximo_fronteira', 'tempo',
+               'caminho')
+
+
+def main(argumentos=None):
+    """
+        Ponto de entrada da linha de comando, sem interface gráfica:
+            python -m missionarios_canibais --n 50 --boat 4 --algo astar --format json
+        Resolve uma configuração sem rastro e escreve o caminho e as estatísticas em JSON ou
+        CSV na saída padrão. Retorna o código de saída (ver CODIGOS_SAIDA).
+    """
+    parser = argparse.ArgumentParser(prog='missionarios_canibais',
+                                     description='Resolve o problema dos missionarios e canibais.')
+    parser.add_argument('--n', type=int, required=True, help='numero de missionarios (e de canibais)')
+    parser.add_argument('--boat', type=int, required=True, help='capacidade do barco')
+    parser.add_argument('--cannibals', type=int, default=None, help='numero de canibais, se diferente de --n')
+    parser.add_argument('--min-load', type=int, default=1, help='ocupacao minima do barco')
+    parser.add_argument('--return-boat', type=int, default=None, help='capacidade do barco nas voltas')
+    parser.add_argument('--algo', choices=sorted(ALGORITMOS), default='astar', help='algoritmo de busca')
+    parser.add_argument('--format', choices=('json', 'csv'), default='json', help='formato da saida')
+    parser.add_argument('--max-states', type=int, default=None, help='limite de estados expandidos')
+    parser.add_argument('--timeout', type=float, default=None, help='tempo limite da busca, em segundos')
+    parser.add_argument('--prune', action='store_true', help='poda as viagens de volta dominadas')
+    opcoes = parser.parse_args(argumentos)
+    num_canibais = opcoes.n if opcoes.cannibals is None else opcoes.cannibals
+    if min(opcoes.n, num_canibais, opcoes.boat, opcoes.min_load) < 0 or (opcoes.return_boat or 0) < 0:
+        parser.error('os numeros de pessoas e as capacidades nao podem ser negativos')
+    instancia = Missionarios_Canibais(opcoes.n, opcoes.boat, RASTRO_NENHUM,
+                                      limite_estados=opcoes.max_states, limite_tempo=opcoes.timeout,
+                                      poda_dominancia=opcoes.prune, num_canibais=num_canibais,
+                                      capacidade_minima=opcoes.min_load, capacidade_volta=opcoes.return_boat)
+    try:
+        resultado = instancia.resolver(opcoes.algo)
+    except ImportError as erro:
+        # Algoritmos com dependências opcionais, como a busca vetorizada, contam como erro de uso
+        parser.error(str(erro))
+    if opcoes.format == 'json':
+        registro = dict(resultado.como_dicionario(), num_pessoas=opcoes.n, num_canibais=num_canibais,
+                        tam_barco=opcoes.boat)
+        json.dump(registro, sys.stdout, sort_keys=True)
+        sys.stdout.write('\n')
+    else:
+        linha = dict(resultado.estatisticas, num_pessoas=opcoes.n, num_canibais=num_canibais, tam_barco=opcoes.boat,
+                     algoritmo=opcoes.algo,
+                     caminho=' '.join('{}-{}-{}'.format(*chave) for chave in resultado.caminho or ()))
+        escritor = csv.DictWriter(sys.stdout, COLUNAS_CSV, extrasaction='ignore', lineterminator='\n')
+        escritor.writeheader()
+        escritor.writerow(linha)
+    return CODIGOS_SAIDA[resultado.situacao]
+
+
+if __name__ == '__main__':
+    sys.exit(main())
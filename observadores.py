@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+
+# O cProfile e o tracemalloc são opcionais: sem eles ObservadorPerfil apenas não mede o que
+# depende de cada um
+try:
+    import cProfile
+    import pstats
+except ImportError:
+    cProfile = None
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+
+class Observador():
+    """
+        Interface dos observadores de Missionarios_Canibais. Cada método é chamado pela busca
+        em andamento, recebida em busca, e não faz nada por padrão, então basta sobrescrever
+        os eventos de interesse:
+            ao_iniciar: início de uma busca, com o cabeçalho do seu rastro;
+            ao_expandir: um estado foi retirado da fronteira para ser expandido;
+            ao_gerar: um sucessor válido foi gerado;
+            ao_descartar: um sucessor gerado não entrou na fronteira, por ser repetido ou podado;
+            ao_encontrar_solucao: a busca encontrou a solução, uma lista de estados;
+            ao_terminar: fim da busca, com ou sem solução, com as estatísticas finais.
+        Os estados são informados pelas suas chaves (missionarios_esq, canibais_esq, lado_rio).
+    """
+
+    def ao_iniciar(self, busca, cabecalho):
+        pass
+
+    def ao_expandir(self, busca, chave, profundidade):
+        pass
+
+    def ao_gerar(self, busca, chave, profundidade):
+        pass
+
+    def ao_descartar(self, busca, chave, profundidade):
+        pass
+
+    def ao_encontrar_solucao(self, busca, solucao):
+        pass
+
+    def ao_terminar(self, busca, estatisticas):
+        pass
+
+
+class ObservadorPerfil(Observador):
+    """
+        Observador que mede cada busca com o cProfile e, se memoria for verdadeiro, o pico de
+        memória alocada com o tracemalloc. O pico, em kB, é acrescentado às estatísticas da
+        busca como pico_memoria_kb, e o perfil da última busca fica em self.perfil.
+    """
+
+    def __init__(self, perfil=True, memoria=False):
+        self.medir_perfil = perfil and cProfile is not None
+        self.medir_memoria = memoria and tracemalloc is not None
+        self.perfil = None
+        self.iniciou_tracemalloc = False
+
+    def ao_iniciar(self, busca, cabecalho):
+        if self.medir_memoria:
+            # Se o tracemalloc já estava ligado, apenas o pico é reiniciado
+            self.iniciou_tracemalloc = not tracemalloc.is_tracing()
+            if self.iniciou_tracemalloc:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+        if self.medir_perfil:
+            self.perfil = cProfile.Profile()
+            self.perfil.enable()
+
+    def ao_terminar(self, busca, estatisticas):
+        if self.medir_perfil:
+            self.perfil.disable()
+        if self.medir_memoria:
+            estatisticas['pico_memoria_kb'] = tracemalloc.get_traced_memory()[1] // 1024
+            if self.iniciou_tracemalloc:
+                tracemalloc.stop()
+
+    def relatorio(self, ordem='cumulative', limite=20):
+        """
+            Retorna o texto do perfil da última busca, com as limite funções mais custosas
+            segundo a ordem informada (ver pstats.Stats.sort_stats).
+        """
+        if self.perfil is None:
+            return ''
+        saida = io.StringIO() if str is not bytes else io.BytesIO()
+        pstats.Stats(self.perfil, stream=saida).sort_stats(ordem).print_stats(limite)
+        return saida.getvalue()
@@ -0,0 +1,313 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import multiprocessing
+from urllib.parse import parse_qs, urlsplit
+
+from missionarios_canibais import *
+from lote import ERRO, TEMPO_ESGOTADO, resolver_configuracao
+
+# Tempo limite padrão de cada busca, em segundos. As buscas continuam no pool depois que o
+# prazo das requisições passa, então precisam sempre de um limite finito.
+LIMITE_TEMPO_PADRAO = 30.0
+# Tempo máximo, em segundos, para que um cliente envie a requisição HTTP completa
+PRAZO_LEITURA = 10.0
+# Tamanho máximo da linha de requisição e de cada cabeçalho HTTP
+TAMANHO_MAXIMO_LINHA = 8192
+# Código HTTP das situações de busca que não são sucesso; as demais são respondidas com 200
+CODIGOS_HTTP = {
+    ERRO: 500,
+    TEMPO_ESGOTADO: 504,
+    ORCAMENTO_ESGOTADO: 504,
+}
+MENSAGENS_HTTP = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+    504: 'Gateway Timeout',
+}
+
+
+class ServicoSobrecarregado(Exception):
+    """
+        Lançada quando já há max_pendentes soluções distintas aguardando ou em andamento e
+        uma nova configuração é pedida.
+    """
+
+
+class ServicoSolucoes():
+    """
+        Camada assíncrona (asyncio) sobre o solucionador. As buscas, limitadas pela CPU, são
+        executadas em um pool de processos com lote.resolver_configuracao, sem bloquear o
+        laço de eventos, e requisições simultâneas da mesma configuração (num_pessoas,
+        tam_barco, algoritmo) compartilham uma única busca, desde que o tempo limite dela
+        cubra o prazo da nova requisição.
+        Controle de carga: no máximo max_processos buscas são executadas ao mesmo tempo, e
+        as demais esperam a sua vez; com max_pendentes buscas distintas aguardando ou em
+        andamento, novas configurações são recusadas com ServicoSobrecarregado em vez de
+        formarem uma fila sem limite. Pedidos de uma configuração já em andamento são sempre
+        aceitos, pois não criam trabalho novo.
+        limite_tempo e limite_estados formam o orçamento de cada busca (ver
+        resolver_configuracao). O tempo limite é sempre finito, LIMITE_TEMPO_PADRAO se não for
+        informado, e é reduzido ao prazo da requisição que iniciou a busca, quando menor: o
+        prazo só interrompe a espera do cliente, e sem esse limite buscas abandonadas
+        ocupariam o pool indefinidamente. Uma requisição com prazo maior que o tempo limite da
+        busca em andamento para a sua configuração inicia uma nova busca, que passa a ser a
+        compartilhada; a anterior continua para as requisições que já a aguardavam. diretorio_cache, se informado, é a cache de soluções
+        em disco usada pelos processos de trabalho.
+        Deve ser criado e usado dentro de um laço de eventos em execução e fechado com
+        fechar, ou usado com async with.
+    """
+
+    def __init__(self, max_processos=None, max_pendentes=None, limite_tempo=LIMITE_TEMPO_PADRAO, limite_estados=None,
+                 diretorio_cache=None):
+        if limite_tempo is None or limite_tempo <= 0:
+            raise ValueError('O tempo limite das buscas deve ser positivo')
+        self.max_processos = max_processos or multiprocessing.cpu_count()
+        self.max_pendentes = max_pendentes or 4 * self.max_processos
+        self.limite_tempo = limite_tempo
+        self.limite_estados = limite_estados
+        self.diretorio_cache = diretorio_cache
+        # Processos criados com fork herdariam os sockets das conexões abertas, e os clientes
+        # só veriam o fim da resposta quando o processo de trabalho terminasse
+        metodo = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.contexto = multiprocessing.get_context(metodo)
+        self.executor = self.criar_executor()
+        self.vagas = asyncio.Semaphore(self.max_processos)
+        # Busca compartilhada de cada configuração, como (tarefa, limite_tempo), e todas as
+        # buscas aguardando ou em andamento, inclusive as substituídas por uma busca com um
+        # tempo limite maior
+        self.em_andamento = {}
+        self.tarefas = set()
+        self.requisicoes = 0
+        self.buscas = 0
+        self.coalescidas = 0
+        self.recusadas = 0
+        self.expiradas = 0
+        self.pools_recriados = 0
+
+    def criar_executor(self):
+        return concurrent.futures.ProcessPoolExecutor(self.max_processos, mp_context=self.contexto)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, tipo, valor, rastro):
+        self.fechar()
+
+    def fechar(self):
+        """
+            Cancela as buscas em andamento e encerra o pool de processos.
+        """
+        for tarefa in self.tarefas:
+            tarefa.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def resolver(self, num_pessoas, tam_barco, algoritmo='astar', prazo=None):
+        """
+            Resolve uma configuração e retorna o registro do resultado (ver
+            lote.criar_registro). prazo é o tempo máximo de espera desta requisição, em
+            segundos, incluindo a espera por uma vaga no pool; quando ele passa,
+            asyncio.TimeoutError é lançada, mas a busca continua para as outras requisições
+            que a compartilham, até o seu tempo limite. Se a busca passar do orçamento, o
+            registro tem a situação ORCAMENTO_ESGOTADO ou TEMPO_ESGOTADO. Lança ValueError
+            para parâmetros inválidos e ServicoSobrecarregado quando o serviço não aceita novas
+            buscas.
+        """
+        if algoritmo not in ALGORITMOS:
+            raise ValueError('Algoritmo desconhecido: {}'.format(algoritmo))
+        if num_pessoas < 1 or tam_barco < 1:
+            raise ValueError('O número de pessoas e o tamanho do barco devem ser positivos')
+        self.requisicoes += 1
+        chave = (num_pessoas, tam_barco, algoritmo)
+        limite_tempo = self.limite_tempo if prazo is None else min(self.limite_tempo, prazo)
+        tarefa, limite_compartilhado = self.em_andamento.get(chave, (None, None))
+        if tarefa is not None and limite_compartilhado >= limite_tempo:
+            self.coalescidas += 1
+        elif len(self.tarefas) >= self.max_pendentes:
+            self.recusadas += 1
+            raise ServicoSobrecarregado('{} buscas pendentes'.format(len(self.tarefas)))
+        else:
+            tarefa = asyncio.ensure_future(self.executar_busca(chave, limite_tempo))
+            self.em_andamento[chave] = (tarefa, limite_tempo)
+            self.tarefas.add(tarefa)
+            self.buscas += 1
+        try:
+            # O shield impede que o prazo ou o cancelamento de uma requisição cancelem a busca
+            # compartilhada
+            return await asyncio.wait_for(asyncio.shield(tarefa), prazo)
+        except asyncio.TimeoutError:
+            self.expiradas += 1
+            raise
+
+    async def executar_busca(self, chave, limite_tempo):
+        """
+            Executa uma busca no pool. Se um processo de trabalho morrer (por falta de memória
+            ou um sinal, por exemplo), o pool inteiro fica inutilizável: ele é substituído por
+            um novo, para as buscas seguintes, e as buscas que estavam nele falham.
+        """
+        try:
+            async with self.vagas:
+                laco = asyncio.get_running_loop()
+                executor = self.executor
+                try:
+                    return await laco.run_in_executor(
+                        executor, resolver_configuracao, chave[0], chave[1], chave[2], limite_tempo,
+                        self.diretorio_cache, True, self.limite_estados)
+                except concurrent.futures.process.BrokenProcessPool:
+                    # Várias buscas podem falhar com o mesmo pool; só a primeira o substitui
+                    if self.executor is executor:
+                        executor.shutdown(wait=False)
+                        self.executor = self.criar_executor()
+                        self.pools_recriados += 1
+                    raise
+        finally:
+            tarefa = asyncio.current_task()
+            self.tarefas.discard(tarefa)
+            if self.em_andamento.get(chave, (None,))[0] is tarefa:
+                del self.em_andamento[chave]
+
+    def estatisticas(self):
+        return {
+            'requisicoes': self.requisicoes,
+            'buscas': self.buscas,
+            'coalescidas': self.coalescidas,
+            'recusadas': self.recusadas,
+            'expiradas': self.expiradas,
+            'pools_recriados': self.pools_recriados,
+            'em_andamento': len(self.tarefas),
+        }
+
+
+def ler_parametros(consulta, prazo_padrao):
+    """
+        Converte a consulta de GET /resolver, com os mesmos nomes das opções da linha de
+        comando (n, boat, algo e deadline, em segundos), nos argumentos de
+        ServicoSolucoes.resolver. Lança ValueError para parâmetros ausentes ou inválidos.
+    """
+    parametros = dict((nome, valores[-1]) for nome, valores in parse_qs(consulta).items())
+    try:
+        num_pessoas = int(parametros['n'])
+        tam_barco = int(parametros['boat'])
+    except KeyError as erro:
+        raise ValueError('Parâmetro obrigatório ausente: {}'.format(erro.args[0]))
+    prazo = float(parametros['deadline']) if 'deadline' in parametros else prazo_padrao
+    if prazo is not None and prazo <= 0:
+        raise ValueError('O prazo deve ser positivo')
+    return num_pessoas, tam_barco, parametros.get('algo', 'astar'), prazo
+
+
+async def responder(escritor, codigo, corpo):
+    conteudo = (json.dumps(corpo, sort_keys=True) + '\n').encode('utf-8')
+    cabecalho = ('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n'
+                 'Connection: close\r\n\r\n').format(codigo, MENSAGENS_HTTP[codigo], len(conteudo))
+    escritor.write(cabecalho.encode('ascii') + conteudo)
+    await escritor.drain()
+
+
+async def atender(servico, leitor, escritor, prazo_padrao=None):
+    """
+        Atende uma conexão HTTP/1.1 com uma única requisição. Rotas:
+            GET /resolver?n=50&boat=4&algo=astar&deadline=2: registro do resultado;
+            GET /estatisticas: contadores do serviço (ver ServicoSolucoes.estatisticas).
+        Os erros são respondidos em JSON com o campo erro: 400 para parâmetros inválidos,
+        503 quando o serviço está sobrecarregado, 504 quando o prazo passa e 500 quando a
+        busca falha. Buscas que passam do orçamento também são respondidas com 504, com o
+        registro, que traz as estatísticas, no corpo.
+    """
+    try:
+        try:
+            linha = await asyncio.wait_for(leitor.readline(), PRAZO_LEITURA)
+            # Os cabeçalhos não são usados, mas precisam ser lidos até a linha em branco
+            cabecalho = linha
+            while cabecalho not in (b'\r\n', b'\n', b''):
+                cabecalho = await asyncio.wait_for(leitor.readline(), PRAZO_LEITURA)
+        except (asyncio.TimeoutError, ValueError):
+            return
+        partes = linha.decode('latin-1').split()
+        if len(partes) != 3:
+            await responder(escritor, 400, {'erro': 'Requisição inválida'})
+            return
+        metodo, alvo, _ = partes
+        endereco = urlsplit(alvo)
+        if endereco.path not in ('/resolver', '/estatisticas'):
+            await responder(escritor, 404, {'erro': 'Rota desconhecida: {}'.format(endereco.path)})
+        elif metodo != 'GET':
+            await responder(escritor, 405, {'erro': 'Apenas GET é aceito'})
+        elif endereco.path == '/estatisticas':
+            await responder(escritor, 200, servico.estatisticas())
+        else:
+            try:
+                num_pessoas, tam_barco, algoritmo, prazo = ler_parametros(endereco.query, prazo_padrao)
+                registro = await servico.resolver(num_pessoas, tam_barco, algoritmo, prazo)
+            except ValueError as erro:
+                await responder(escritor, 400, {'erro': str(erro)})
+            except ServicoSobrecarregado as erro:
+                await responder(escritor, 503, {'erro': 'Serviço sobrecarregado: {}'.format(erro)})
+            except asyncio.TimeoutError:
+                await responder(escritor, 504, {'erro': 'Prazo esgotado'})
+            except Exception as erro:
+                # Por exemplo, um processo de trabalho encerrado de forma inesperada
+                await responder(escritor, 500, {'erro': repr(erro)})
+            else:
+                await responder(escritor, CODIGOS_HTTP.get(registro['situacao'], 200), registro)
+    except ConnectionError:
+        pass
+    finally:
+        escritor.close()
+
+
+async def iniciar_servidor(servico, host='127.0.0.1', porta=0, prazo_padrao=None):
+    """
+        Inicia o servidor HTTP do serviço e retorna o asyncio.Server. Com porta 0 o sistema
+        escolhe uma porta livre, informada em servidor.sockets[0].getsockname(), o que
+        permite testar o serviço localmente. prazo_padrao é usado nas requisições que não
+        informam deadline.
+    """
+    return await asyncio.start_server(lambda leitor, escritor: atender(servico, leitor, escritor, prazo_padrao),
+                                      host, porta, limit=TAMANHO_MAXIMO_LINHA)
+
+
+async def servir(opcoes):
+    async with ServicoSolucoes(opcoes.processos, opcoes.max_pendentes, opcoes.timeout, opcoes.max_states) as servico:
+        servidor = await iniciar_servidor(servico, opcoes.host, opcoes.porta, opcoes.deadline)
+        print('Servindo em http://{}:{}'.format(*servidor.sockets[0].getsockname()[:2]))
+        async with servidor:
+            await servidor.serve_forever()
+
+
+def main(argumentos=None):
+    """
+        Executa o serviço pela linha de comando. Exemplo:
+            python servico.py --porta 8080
+            curl 'http://127.0.0.1:8080/resolver?n=50&boat=4&algo=astar&deadline=2'
+    """
+    parser = argparse.ArgumentParser(description='Serviço HTTP do solucionador dos missionários e canibais.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8080)
+    parser.add_argument('--processos', type=int, default=None, help='buscas executadas ao mesmo tempo')
+    parser.add_argument('--max-pendentes', type=int, default=None,
+                        help='buscas distintas aguardando ou em andamento antes de recusar novas')
+    parser.add_argument('--deadline', type=float, default=None, help='prazo padrao de cada requisicao, em segundos')
+    parser.add_argument('--timeout', type=float, default=LIMITE_TEMPO_PADRAO,
+                        help='tempo limite de cada busca, em segundos')
+    parser.add_argument('--max-states', type=int, default=None, help='estados expandidos por busca')
+    opcoes = parser.parse_args(argumentos)
+    if opcoes.timeout <= 0:
+        parser.error('--timeout deve ser positivo')
+    try:
+        asyncio.run(servir(opcoes))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,24 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from Tkinter import *
-import tkMessageBox
+import threading
+try:
+    from Tkinter import *
+    import tkMessageBox
+    import Queue as queue
+except ImportError:
+    from tkinter import *
+    import tkinter.messagebox as tkMessageBox
+    import queue
 from missionarios_canibais import *
 
+# Número máximo de linhas mantidas no campo de texto; as mais antigas são descartadas
+LIMITE_LINHAS = 5000
+# Intervalo, em milissegundos, entre as atualizações da tela durante uma busca
+INTERVALO_ATUALIZACAO = 50
+# Número máximo de trechos do rastro inseridos no campo de texto a cada atualização
+TRECHOS_POR_ATUALIZACAO = 2000
+
 
 class AppScript(Frame):
     def __init__(self, width = 500, height=500):
@@ -12,6 +26,9 @@ class AppScript(Frame):
         
         self.string = ""
         self.estado = None
+        self.trabalho = None
+        self.cancelamento = None
+        self.saida = None
 
         self.frame1 = Frame(self)
         self.frame1.pack(side=TOP)
@@ -68,57 +85,126 @@ class AppScript(Frame):
         self.button3.configure(text="Heuristica A*", background="darkgray", height=1, width=12, font=self.fonte1, fg="black")
         self.button3.pack(side=LEFT)
         self.button3.bind("<1>", self.busca_heuristica_A)
+
+        self.button4 = Button(self.frame3)
+        self.button4.configure(text="Cancelar", background="darkgray", height=1, width=12, font=self.fonte1, fg="black", state=DISABLED)
+        self.button4.pack(side=LEFT)
+        self.button4.bind("<1>", self.cancelar)
+
+        self.progresso = Label(self, text="", font=self.fonte1)
+        self.progresso.pack(pady=5)
         
 
     def busca_largura(self, event):
+        if self.executando():
+            return
         self.string = ""
         numero_pessoas = int(self.campo1.get())
         tamanho_barco = int(self.campo2.get())
         if tamanho_barco < 2:
             tkMessageBox.showerror("ERRO", "Tamanho do barco deve ser >= 2")
         else:
-            self.estado = Missionarios_Canibais(numero_pessoas, tamanho_barco)
-            self.string = self.estado.gerar_solucao_busca_largura()
-            self.setaTxt(self.string)
+            self.resolver(Missionarios_Canibais.gerar_solucao_busca_largura, numero_pessoas, tamanho_barco)
 
     def busca_profundidade(self, event):
+        if self.executando():
+            return
         self.string = ""
         numero_pessoas = int(self.campo1.get())
         tamanho_barco = int(self.campo2.get())
         if tamanho_barco < 2:
             tkMessageBox.showerror("ERRO", "Tamanho do barco deve ser >= 2")
         else:
-            self.estado = Missionarios_Canibais(numero_pessoas, tamanho_barco)
-            self.string = self.estado.gerar_solucao_busca_profundidade()
-            self.setaTxt(self.string)
+            self.resolver(Missionarios_Canibais.gerar_solucao_busca_profundidade, numero_pessoas, tamanho_barco)
 
     def busca_gulosa(self, event):
+        if self.executando():
+            return
         self.string = ""
         numero_pessoas = int(self.campo1.get())
         tamanho_barco = int(self.campo2.get())
         if tamanho_barco < 2:
             tkMessageBox.showerror("ERRO", "Tamanho do barco deve ser >= 2")
         else:
-            self.estado = Missionarios_Canibais(numero_pessoas, tamanho_barco)
-            self.string = self.estado.gerar_solucao_busca_gulosa()
-            self.setaTxt(self.string)
+            self.resolver(Missionarios_Canibais.gerar_solucao_busca_gulosa, numero_pessoas, tamanho_barco)
 
     def busca_heuristica_A(self, event):
+        if self.executando():
+            return
         self.string = ""
         numero_pessoas = int(self.campo1.get())
         tamanho_barco = int(self.campo2.get())
         if tamanho_barco < 2:
             tkMessageBox.showerror("ERRO", "Tamanho do barco deve ser >= 2")
         else:
-            self.estado = Missionarios_Canibais(numero_pessoas, tamanho_barco)
-            self.string = self.estado.gerar_solucao_busca_A()
-            self.setaTxt(self.string)
+            self.resolver(Missionarios_Canibais.gerar_solucao_busca_A, numero_pessoas, tamanho_barco)
             
-    def setaTxt(self, string):
+    def executando(self):
+        return self.trabalho is not None and self.trabalho.is_alive()
+
+    def resolver(self, gerar_solucao, numero_pessoas, tamanho_barco):
+        """
+            Executa a busca em uma thread separada, para que a janela continue respondendo. O
+            rastro é enviado por uma fila e copiado aos poucos para o campo de texto por
+            acompanhar, chamada periodicamente pelo laço de eventos do Tk.
+        """
         self.texto.configure(state=NORMAL)
         self.texto.delete(1.0,END)
-        self.texto.insert(1.0, string)
         self.texto.configure(state=DISABLED)
+        self.cancelamento = threading.Event()
+        self.saida = SaidaFila()
+        self.estado = Missionarios_Canibais(numero_pessoas, tamanho_barco, RASTRO_COMPLETO, self.saida,
+                                            cancelamento=self.cancelamento)
+        self.trabalho = threading.Thread(target=self.executar, args=(gerar_solucao,))
+        self.trabalho.daemon = True
+        self.button4.configure(state=NORMAL)
+        self.trabalho.start()
+        self.after(INTERVALO_ATUALIZACAO, self.acompanhar)
+
+    def executar(self, gerar_solucao):
+        self.string = gerar_solucao(self.estado)
+
+    def cancelar(self, event):
+        if self.executando():
+            self.cancelamento.set()
+
+    def acompanhar(self):
+        terminou = not self.executando()
+        trechos = []
+        try:
+            while len(trechos) < TRECHOS_POR_ATUALIZACAO:
+                trechos.append(self.saida.fila.get_nowait())
+        except queue.Empty:
+            pass
+        if trechos:
+            self.texto.configure(state=NORMAL)
+            self.texto.insert(END, "".join(trechos))
+            # Descarta as linhas mais antigas para que o widget não cresça sem limite
+            excesso = int(self.texto.index(END).split('.')[0]) - 1 - LIMITE_LINHAS
+            if excesso > 0:
+                self.texto.delete(1.0, "{}.0".format(excesso + 1))
+            self.texto.configure(state=DISABLED)
+            self.texto.see(END)
+        self.progresso.configure(text="Estados visitados: {}".format(self.estado.estados_expandidos))
+        if terminou and self.saida.fila.empty():
+            self.button4.configure(state=DISABLED)
+            if self.cancelamento.is_set():
+                self.progresso.configure(text="Busca cancelada apos {} estados visitados".format(self.estado.estados_expandidos))
+        else:
+            self.after(INTERVALO_ATUALIZACAO, self.acompanhar)
+
+
+class SaidaFila():
+    """
+        Saída de rastro que guarda o texto recebido em uma fila, para ser lido pela thread da
+        interface. A fila é limitada, então uma busca que gera rastro mais rápido do que a
+        tela consegue mostrar espera até que haja espaço.
+    """
+    def __init__(self, tamanho_maximo=10000):
+        self.fila = queue.Queue(tamanho_maximo)
+
+    def write(self, string):
+        self.fila.put(string)
 
 raiz = Tk()
 aplicativo = AppScript(raiz)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import json
+import os
+import signal
+import time
+import unittest
+
+from servico import ServicoSolucoes, iniciar_servidor
+
+
+async def requisitar(porta, alvo):
+    """
+        Envia GET alvo ao servidor local e retorna (código HTTP, corpo JSON).
+    """
+    leitor, escritor = await asyncio.open_connection('127.0.0.1', porta)
+    escritor.write('GET {} HTTP/1.1\r\nHost: 127.0.0.1\r\n\r\n'.format(alvo).encode('ascii'))
+    await escritor.drain()
+    resposta = await leitor.read()
+    escritor.close()
+    cabecalho, corpo = resposta.split(b'\r\n\r\n', 1)
+    return int(cabecalho.split()[1]), json.loads(corpo.decode('utf-8'))
+
+
+async def esperar(condicao, limite=20.0):
+    """
+        Espera até que condicao() seja verdadeira, por no máximo limite segundos.
+    """
+    fim = time.time() + limite
+    while not condicao():
+        if time.time() > fim:
+            raise AssertionError('Condição não satisfeita em {} s'.format(limite))
+        await asyncio.sleep(0.05)
+
+
+class TesteServico(unittest.IsolatedAsyncioTestCase):
+    """
+        Testa o serviço contra um servidor HTTP local, em uma porta escolhida pelo sistema.
+    """
+
+    async def iniciar(self, **argumentos):
+        self.servico = ServicoSolucoes(**argumentos)
+        self.servidor = await iniciar_servidor(self.servico, porta=0)
+        self.porta = self.servidor.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.servidor.close()
+        await self.servidor.wait_closed()
+        self.servico.fechar()
+
+    async def test_requisicoes_iguais_compartilham_a_busca(self):
+        await self.iniciar(max_processos=2)
+        alvo = '/resolver?n=60&boat=4&algo=aprofundamento_iterativo'
+        respostas = await asyncio.gather(*[requisitar(self.porta, alvo) for _ in range(8)])
+        self.assertEqual(set(codigo for codigo, _ in respostas), {200})
+        self.assertEqual(set(corpo['profundidade_solucao'] for _, corpo in respostas), {117})
+        self.assertEqual(self.servico.buscas, 1)
+        self.assertEqual(self.servico.coalescidas, 7)
+
+    async def test_sobrecarga_responde_503(self):
+        await self.iniciar(max_processos=1, max_pendentes=1)
+        primeira = asyncio.ensure_future(
+            requisitar(self.porta, '/resolver?n=120&boat=4&algo=aprofundamento_iterativo'))
+        await esperar(lambda: self.servico.em_andamento)
+        codigo, corpo = await requisitar(self.porta, '/resolver?n=5&boat=3')
+        self.assertEqual(codigo, 503)
+        self.assertIn('erro', corpo)
+        # Requisições iguais à busca em andamento continuam sendo aceitas
+        codigo, _ = await requisitar(self.porta, '/resolver?n=120&boat=4&algo=aprofundamento_iterativo')
+        self.assertEqual(codigo, 200)
+        self.assertEqual((await primeira)[0], 200)
+
+    async def test_prazo_responde_504_e_libera_o_pool(self):
+        await self.iniciar(max_processos=1, max_pendentes=1)
+        codigo, _ = await requisitar(self.porta, '/resolver?n=10000000&boat=5&algo=largura&deadline=0.5')
+        self.assertEqual(codigo, 504)
+        self.assertEqual(self.servico.expiradas, 1)
+        # A busca abandonada termina pelo seu tempo limite e deixa de ocupar o pool
+        await esperar(lambda: not self.servico.em_andamento)
+        codigo, _ = await requisitar(self.porta, '/resolver?n=5&boat=3&deadline=10')
+        self.assertEqual(codigo, 200)
+
+    async def test_prazo_maior_nao_compartilha_busca_com_limite_menor(self):
+        await self.iniciar(max_processos=2, limite_tempo=1.5)
+        alvo = '/resolver?n=10000000&boat=5&algo=largura'
+        curta = asyncio.ensure_future(requisitar(self.porta, alvo + '&deadline=0.5'))
+        await esperar(lambda: self.servico.em_andamento)
+        codigo, corpo = await requisitar(self.porta, alvo)
+        self.assertEqual((await curta)[0], 504)
+        # A segunda requisição, sem prazo, tem uma busca própria com o tempo limite do serviço,
+        # e o orçamento esgotado é respondido com 504
+        self.assertEqual(self.servico.buscas, 2)
+        self.assertEqual(self.servico.coalescidas, 0)
+        self.assertEqual(codigo, 504)
+        self.assertEqual(corpo['situacao'], 'orcamento_esgotado')
+        self.assertGreaterEqual(corpo['estatisticas']['tempo'], 1.5)
+
+    async def test_pool_e_recriado_quando_um_processo_morre(self):
+        await self.iniciar(max_processos=1)
+        primeira = asyncio.ensure_future(requisitar(self.porta, '/resolver?n=10000000&boat=5&algo=largura'))
+        await esperar(lambda: self.servico.executor._processes)
+        # Espera a busca começar no processo de trabalho antes de matá-lo
+        await asyncio.sleep(0.5)
+        for pid in list(self.servico.executor._processes):
+            os.kill(pid, signal.SIGKILL)
+        self.assertEqual((await primeira)[0], 500)
+        codigo, corpo = await requisitar(self.porta, '/resolver?n=5&boat=3&deadline=10')
+        self.assertEqual(codigo, 200)
+        self.assertEqual(corpo['situacao'], 'resolvido')
+        self.assertEqual(self.servico.pools_recriados, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()